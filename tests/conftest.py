@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,21 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    from posts import lookups
+    from users.backends import user_cache
+    cache.clear()
+    user_cache.clear()
+    lookups.groups.clear()
+    lookups.authors.clear()
+
+
+@pytest.fixture(autouse=True)
+def eager_jobs(settings):
+    # Отложенные задания в тестах выполняются сразу после коммита, без
+    # воркеров.
+    settings.JOBS_EAGER = True
@@ -0,0 +1,64 @@
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from posts.models import Group, Post
+
+pytestmark = [pytest.mark.django_db]
+
+ROUTES = {
+    'posts:index', 'posts:group_list', 'posts:profile', 'posts:post_detail',
+    'posts:post_create', 'posts:post_edit', 'users:login', 'users:signup',
+    'about:author', 'about:tech',
+}
+
+
+def test_bench_routes_reports_and_compares(tmp_path, few_posts_with_group):
+    output = tmp_path / 'bench.json'
+    call_command(
+        'bench_routes', requests=3, warmup=1, output=str(output),
+        stdout=StringIO(),
+    )
+    results = json.loads(output.read_text())['results']['current']
+    assert set(results) == ROUTES, 'Проверьте, что замеряются все маршруты'
+    for name, result in results.items():
+        assert result['status'] == [200], name
+        assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+        assert result['bytes'] > 0
+
+    baseline = json.loads(output.read_text())
+    baseline['results']['current']['posts:post_edit']['queries'] = 0
+    baseline['results']['current']['about:tech']['p95_ms'] = 0.001
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(json.dumps(baseline))
+    err = StringIO()
+    with pytest.raises(CommandError):
+        call_command(
+            'bench_routes', requests=3, baseline=str(baseline_path),
+            stdout=StringIO(), stderr=err,
+        )
+    assert 'posts:post_edit' in err.getvalue()
+    assert 'about:tech' in err.getvalue()
+
+
+def test_bench_routes_leaves_db_and_cache_alone(few_posts_with_group):
+    cache.set('site-key', 'site')
+    counts = [model.objects.count() for model in (get_user_model(), Group, Post)]
+    call_command('bench_routes', requests=2, warmup=1, cold=True, stdout=StringIO())
+    assert cache.get('site-key') == 'site', (
+        'Проверьте, что замер не очищает кеш сайта'
+    )
+    assert not cache.get('posts:feed-version:global'), (
+        'Проверьте, что замер пишет в свой кеш'
+    )
+    assert [model.objects.count() for model in (get_user_model(), Group, Post)] == counts, (
+        'Проверьте, что замер ничего не создаёт в базе'
+    )
+
+
+def test_bench_routes_needs_posts():
+    with pytest.raises(CommandError):
+        call_command('bench_routes', requests=1, stdout=StringIO())
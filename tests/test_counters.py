@@ -0,0 +1,80 @@
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from posts import timeline
+from posts.forms import PostForm
+from posts.models import AuthorStats, Group, Post, User
+from posts.utils import GLOBAL_FEED, author_feed, feed_count_key, group_feed
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _counts(user, *groups):
+    stats = AuthorStats.objects.filter(author=user).first()
+    return (
+        stats.posts_count if stats else 0,
+        [Group.objects.get(pk=group.pk).posts_count for group in groups],
+    )
+
+
+class TestPostCounters:
+
+    def test_create_move_delete(self, user, group):
+        other = Group.objects.create(title='Другая', slug='other', description='')
+        post = Post.objects.create(text='Пост', author=user, group=group)
+        Post.objects.create(text='Ещё пост', author=user)
+        assert _counts(user, group, other) == (2, [1, 0]), (
+            'Проверьте, что создание поста увеличивает счётчики автора и группы'
+        )
+
+        post = Post.objects.get(pk=post.pk)
+        form = PostForm({'text': post.text, 'group': other.pk}, instance=post)
+        assert form.is_valid()
+        form.save()
+        assert _counts(user, group, other) == (2, [0, 1]), (
+            'Проверьте, что перенос поста в другую группу переносит счётчик'
+        )
+
+        Post.objects.filter(pk=post.pk).delete()
+        assert _counts(user, group, other) == (1, [0, 0]), (
+            'Проверьте, что удаление поста уменьшает счётчики'
+        )
+
+    def test_profile_uses_counter(self, client, post_with_group):
+        AuthorStats.objects.filter(author=post_with_group.author).update(
+            posts_count=7
+        )
+        response = client.get(f'/profile/{post_with_group.author.username}/')
+        assert response.context['posts_count'] == 7
+
+    def test_reconcile_repairs_drift(self, user, post_with_group):
+        AuthorStats.objects.all().delete()
+        Group.objects.update(posts_count=42)
+        call_command('reconcile_post_counters', batch_size=1)
+        assert _counts(user, post_with_group.group) == (1, [1]), (
+            'Проверьте, что reconcile_post_counters восстанавливает счётчики'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconcile_repairs_followers_and_cached_counts(self, user, post_with_group):
+        group = post_with_group.group
+        follower = User.objects.create(username='follower')
+        timeline.follow(follower, author=user)
+        timeline.follow(follower, group=group)
+        AuthorStats.objects.filter(author=user).update(followers_count=9, posts_count=5)
+        Group.objects.update(followers_count=9)
+        for feed in (GLOBAL_FEED, author_feed(user.pk), group_feed(group.pk)):
+            cache.set(feed_count_key(feed), 5)
+        call_command('reconcile_post_counters', stdout=StringIO())
+        stats = AuthorStats.objects.get(author=user)
+        assert (stats.posts_count, stats.followers_count) == (1, 1), (
+            'Проверьте, что reconcile_post_counters восстанавливает число подписчиков'
+        )
+        assert Group.objects.get(pk=group.pk).followers_count == 1
+        assert cache.get(feed_count_key(author_feed(user.pk))) is None, (
+            'Проверьте, что закешированные числа постов исправленных лент сбрасываются'
+        )
+        assert cache.get(feed_count_key(GLOBAL_FEED)) is None
+        assert cache.get(feed_count_key(group_feed(group.pk))) is None
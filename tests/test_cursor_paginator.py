@@ -0,0 +1,48 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from posts.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestCursorPaginator:
+
+    def _collect(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        return response.context['page_obj']
+
+    def test_cursor_walks_whole_feed(self, client, settings, few_posts_with_group):
+        settings.PAGINATION_MODE = 'cursor'
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list('pk', flat=True)
+        )
+        seen = []
+        page_obj = self._collect(client, '/')
+        seen.extend(post.pk for post in page_obj)
+        while page_obj.has_next():
+            page_obj = self._collect(client, f'/?after={page_obj.next_cursor}')
+            seen.extend(post.pk for post in page_obj)
+        assert seen == expected, (
+            'Проверьте, что курсорная пагинация проходит ленту без пропусков и повторов'
+        )
+
+        back = self._collect(client, f'/?before={page_obj.previous_cursor}')
+        assert [post.pk for post in back] == expected[:10], (
+            'Проверьте, что ссылка `?before=` возвращает предыдущую страницу'
+        )
+        assert back.has_next()
+
+    def test_cursor_mode_skips_count(self, client, few_posts_with_group):
+        first = Post.objects.order_by('-pub_date', '-pk').first()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/group/{first.group.slug}/?after=bad-token')
+        assert response.status_code == 200
+        assert not any(
+            re.search(r'COUNT\(', query['sql']) for query in queries.captured_queries
+        ), 'В курсорном режиме лента не должна выполнять COUNT(*)'
+        html = response.content.decode()
+        assert '?after=' in html, 'Проверьте, что шаблон выводит ссылку на следующую страницу'
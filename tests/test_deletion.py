@@ -0,0 +1,89 @@
+from io import StringIO
+
+import pytest
+from core import jobs
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from posts import deletion, timeline
+from posts.models import AuthorStats, Follow, Group, Post, TimelineEntry
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestBatchedDeletion:
+
+    def test_delete_user(self, mixer, user, group):
+        other = get_user_model().objects.create(username='other')
+        mixer.cycle(12).blend(Post, author=user, group=group)
+        mixer.cycle(3).blend(Post, author=other, group=group)
+        out = StringIO()
+        call_command('delete_in_batches', '--user', user.username, batch_size=5, stdout=out)
+        assert not get_user_model().objects.filter(pk=user.pk).exists()
+        assert Post.objects.count() == 3
+        assert Group.objects.get(pk=group.pk).posts_count == 3, (
+            'Проверьте, что счётчики групп уменьшаются при удалении пачками'
+        )
+        assert AuthorStats.objects.get(author=other).posts_count == 3
+        assert '5 из 12' in out.getvalue() and '12 из 12' in out.getvalue(), (
+            'Проверьте, что команда сообщает о ходе удаления'
+        )
+
+    def test_delete_group_detaches_posts(self, mixer, user, group):
+        mixer.cycle(7).blend(Post, author=user, group=group)
+        call_command('delete_in_batches', '--group', group.slug, batch_size=3, stdout=StringIO())
+        assert not Group.objects.filter(pk=group.pk).exists()
+        assert Post.objects.filter(author=user, group=None).count() == 7
+        assert AuthorStats.objects.get(author=user).posts_count == 7
+
+    def test_follows_are_deleted_in_batches(self, mixer, user, group):
+        users = get_user_model().objects
+        followed = users.create(username='followed')
+        followers = [users.create(username=f'follower{i}') for i in range(5)]
+        mixer.blend(Post, author=followed, group=group)
+        timeline.follow(user, author=followed)
+        timeline.follow(user, group=group)
+        for follower in followers:
+            timeline.follow(follower, author=user)
+        deletion.delete_user(user, batch_size=2)
+        assert not Follow.objects.filter(user=user).exists()
+        assert not Follow.objects.filter(author=user).exists()
+        assert not TimelineEntry.objects.exists()
+        assert AuthorStats.objects.get(author=followed).followers_count == 0, (
+            'Проверьте, что удаление подписок пачками уменьшает счётчики подписчиков'
+        )
+        assert Group.objects.get(pk=group.pk).followers_count == 0
+
+        timeline.follow(followers[0], group=group)
+        deletion.delete_group(group, batch_size=2)
+        assert not Follow.objects.exists()
+
+    def test_admin_delete_is_queued(self, settings, admin_client, mixer, user, group):
+        settings.JOBS_EAGER = False
+        mixer.cycle(4).blend(Post, author=user, group=group)
+        response = admin_client.get(f'/admin/auth/user/{user.pk}/delete/')
+        assert response.status_code == 200
+        assert response.context['model_count']
+        response = admin_client.post(
+            '/admin/posts/group/',
+            {'action': 'delete_selected', '_selected_action': [group.pk], 'post': 'yes'},
+            follow=True,
+        )
+        assert Group.objects.filter(pk=group.pk).exists(), (
+            'Проверьте, что админка не удаляет группу в запросе'
+        )
+        assert 'поставлено в очередь' in response.content.decode()
+        assert 'в очереди' in admin_client.get('/admin/posts/group/').content.decode(), (
+            'Проверьте, что в списке групп виден ход удаления'
+        )
+        response = admin_client.post(
+            f'/admin/auth/user/{user.pk}/delete/', {'post': 'yes'}
+        )
+        assert response.status_code == 302
+        assert Post.objects.count() == 4
+
+        while jobs.run_batch('worker', batch_size=10):
+            pass
+        assert not Group.objects.filter(pk=group.pk).exists()
+        assert not get_user_model().objects.filter(pk=user.pk).exists()
+        assert not Post.objects.exists()
+        assert deletion.progress('posts.delete_group', group.pk) is None
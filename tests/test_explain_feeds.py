@@ -0,0 +1,17 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_feeds_use_indexes():
+    out = StringIO()
+    call_command('explain_feeds', posts=300, users=5, groups=3, repeat=1, stdout=out)
+    output = out.getvalue()
+    assert 'USING INDEX post_pub_date_id_idx' in output, (
+        'Лента `index` должна читаться по индексу (pub_date, id)'
+    )
+    assert 'USING INDEX post_group_pub_date_idx' in output
+    assert 'USING INDEX post_author_pub_date_idx' in output
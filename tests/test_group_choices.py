@@ -0,0 +1,86 @@
+import pytest
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from posts.forms import PostForm
+from posts.models import Group
+
+
+def _group_queries(queries):
+    return [q for q in queries if 'posts_group' in q['sql']]
+
+
+class TestGroupChoices:
+
+    @pytest.mark.django_db
+    def test_form_choices_are_cached(self, mixer):
+        groups = mixer.cycle(30).blend(Group)
+        str(PostForm()['group'])
+        with CaptureQueriesContext(connection) as ctx:
+            html = str(PostForm()['group'])
+        assert _group_queries(ctx.captured_queries) == [], (
+            'Проверьте, что список групп в форме берётся из кеша'
+        )
+        for group in groups:
+            assert f'value="{group.pk}"' in html
+
+    @pytest.mark.django_db
+    def test_form_validates_group(self, user, group):
+        form = PostForm(data={'text': 'Текст', 'group': group.pk})
+        assert form.is_valid()
+        assert form.cleaned_data['group'] == group
+        form = PostForm(data={'text': 'Текст', 'group': group.pk + 100})
+        assert not form.is_valid()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_save_invalidates_choices(self):
+        group = Group.objects.create(title='Старое', slug='old')
+        assert 'Старое' in str(PostForm()['group'])
+        group.title = 'Новое'
+        group.save()
+        Group.objects.create(title='Другая', slug='other')
+        html = str(PostForm()['group'])
+        assert 'Новое' in html and 'Другая' in html, (
+            'Проверьте, что изменение групп сбрасывает кеш списка групп'
+        )
+
+    @pytest.mark.django_db
+    def test_admin_prefix_search(self):
+        music = Group.objects.create(title='Музыка', slug='music')
+        Group.objects.create(title='Кино', slug='movies-and-music')
+        admin_model = site._registry[Group]
+        request = RequestFactory().get('/admin/posts/group/')
+        for term in ('муз', 'Муз', 'mus'):
+            queryset, _ = admin_model.get_search_results(
+                request, Group.objects.all(), term
+            )
+            assert list(queryset) == [music], (
+                'Проверьте, что группы ищутся по началу названия или slug'
+            )
+
+    @pytest.mark.django_db
+    def test_admin_prefix_search_with_astral_characters(self):
+        emoji = Group.objects.create(title='Муз\U0001F3B5', slug='emoji')
+        admin_model = site._registry[Group]
+        request = RequestFactory().get('/admin/posts/group/')
+        queryset, _ = admin_model.get_search_results(
+            request, Group.objects.all(), 'Муз'
+        )
+        assert list(queryset) == [emoji], (
+            'Проверьте, что поиск по началу находит названия с символами вне BMP'
+        )
+
+    @pytest.mark.django_db
+    def test_admin_changelist_titles_groups_once(self, admin_client, mixer, user):
+        groups = mixer.cycle(3).blend(Group)
+        for group in groups:
+            mixer.cycle(2).blend('posts.Post', author=user, group=group)
+        admin_client.get('/admin/posts/post/')
+        with CaptureQueriesContext(connection) as ctx:
+            html = admin_client.get('/admin/posts/post/').content.decode()
+        assert not [
+            q for q in ctx.captured_queries if 'FROM "posts_group"' in q['sql']
+        ], 'Проверьте, что группы в списке постов не запрашиваются по строкам'
+        for group in groups:
+            assert html.count(f'>{group.title}</option>') == 2
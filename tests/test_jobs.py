@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from core import jobs
+from core.models import Job
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from posts import timeline
+from posts.models import TimelineEntry
+
+pytestmark = [pytest.mark.django_db]
+
+calls = []
+
+
+@jobs.task('tests.record', batched=True)
+def record(payloads):
+    calls.append([payload['n'] for payload in payloads])
+
+
+@jobs.task('tests.fail')
+def fail(n):
+    raise RuntimeError(f'задание {n} упало')
+
+
+@pytest.fixture(autouse=True)
+def queued_jobs(settings):
+    settings.JOBS_EAGER = False
+    calls.clear()
+
+
+class TestQueue:
+
+    def test_key_deduplicates_pending_jobs(self):
+        jobs.enqueue('tests.record', {'n': 1}, key='same')
+        jobs.enqueue('tests.record', {'n': 2}, key='same')
+        jobs.enqueue('tests.record', {'n': 3})
+        assert Job.objects.count() == 2, (
+            'Проверьте, что ждущее задание с тем же ключом не дублируется'
+        )
+
+    def test_similar_jobs_run_as_one_batch(self):
+        for n in range(5):
+            jobs.enqueue('tests.record', {'n': n})
+        jobs.enqueue('tests.fail', {'n': 0}, delay=60)
+        assert jobs.run_batch('worker', batch_size=3) == 3
+        assert jobs.run_batch('worker', batch_size=3) == 2
+        assert jobs.run_batch('worker', batch_size=3) == 0, (
+            'Проверьте, что задание с delay не выполняется раньше срока'
+        )
+        assert calls == [[0, 1, 2], [3, 4]], (
+            'Проверьте, что задания с одним именем передаются обработчику пачкой'
+        )
+        assert list(Job.objects.values_list('name', flat=True)) == ['tests.fail']
+
+    def test_failed_job_is_retried_then_kept(self, settings):
+        settings.JOBS_MAX_ATTEMPTS = 2
+        jobs.enqueue('tests.fail', {'n': 1})
+        jobs.run_batch('worker', batch_size=10)
+        job = Job.objects.get()
+        assert job.status == Job.PENDING and job.attempts == 1
+        assert job.run_at > timezone.now(), (
+            'Проверьте, что упавшее задание повторяется с задержкой'
+        )
+        Job.objects.update(run_at=timezone.now())
+        jobs.run_batch('worker', batch_size=10)
+        job = Job.objects.get()
+        assert job.status == Job.FAILED and 'задание 1 упало' in job.last_error
+
+    def test_abandoned_job_is_reclaimed(self, settings):
+        jobs.enqueue('tests.record', {'n': 7})
+        Job.objects.update(
+            status=Job.RUNNING, locked_by='dead',
+            locked_at=timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT + 1),
+        )
+        assert jobs.run_batch('worker', batch_size=10) == 1
+        assert calls == [[7]]
+
+    def test_reclaim_counts_as_attempt(self, settings):
+        settings.JOBS_MAX_ATTEMPTS = 2
+        jobs.enqueue('tests.record', {'n': 7})
+        stale = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT + 1)
+        Job.objects.update(status=Job.RUNNING, locked_by='dead', locked_at=stale)
+        assert jobs.claim('worker', 10)[0].attempts == 1, (
+            'Проверьте, что брошенное задание засчитывается как попытка'
+        )
+        Job.objects.update(locked_at=stale)
+        assert jobs.run_batch('worker', batch_size=10) == 0
+        assert Job.objects.get().status == Job.FAILED, (
+            'Проверьте, что задание, раз за разом брошенное воркером, '
+            'помечается failed'
+        )
+        assert calls == []
+
+    def test_retry_yields_to_newer_job_with_same_key(self):
+        jobs.enqueue('tests.fail', {'n': 1}, key='same')
+        claimed = jobs.claim('worker', 10)
+        jobs.enqueue('tests.fail', {'n': 2}, key='same')
+        jobs.finish(claimed, 'упало')
+        job = Job.objects.get()
+        assert job.payload == '{"n": 2}' and job.attempts == 0, (
+            'Проверьте, что повтор упавшего задания не конфликтует с новым '
+            'заданием с тем же ключом'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_post_create_enqueues_fan_out(user_client, user, django_user_model):
+    reader = django_user_model.objects.create(username='reader')
+    timeline.follow(reader, author=user)
+    user_client.post(reverse('posts:post_create'), {'text': 'Из очереди'})
+    assert not TimelineEntry.objects.exists(), (
+        'Проверьте, что post_create только ставит рассылку в очередь'
+    )
+    assert Job.objects.filter(name='posts.fan_out').count() == 1
+    out = StringIO()
+    call_command('run_workers', '--once', '--workers', '1', stdout=out)
+    assert TimelineEntry.objects.filter(user=reader).count() == 1
+    assert not Job.objects.exists()
+    assert 'Выполнено заданий: 1' in out.getvalue()
+
+
+def test_worker_survives_queue_errors(monkeypatch):
+    results = [RuntimeError('база недоступна'), 0]
+
+    def run_batch(worker, batch_size):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(jobs, 'run_batch', run_batch)
+    out = StringIO()
+    call_command(
+        'run_workers', '--once', '--workers', '1', '--poll-interval', '0',
+        stdout=out,
+    )
+    assert results == [], 'Проверьте, что воркер продолжает после ошибки'
+    assert 'Выполнено заданий: 0' in out.getvalue()
@@ -0,0 +1,71 @@
+import pytest
+from django.http import Http404
+from django.test import Client
+from django.urls import reverse
+from posts import lookups
+from posts.models import Group, Post
+
+from tests.utils import assert_max_queries
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestLookups:
+
+    def test_group_is_cached(self, group):
+        lookups.groups.get_or_404(group.slug)
+        with assert_max_queries(0, 'повторный поиск группы'):
+            found = lookups.groups.get_or_404(group.slug)
+        assert found == group
+
+    def test_missing_key_is_cached(self):
+        with pytest.raises(Http404):
+            lookups.groups.get_or_404('nope')
+        with assert_max_queries(0, 'повторный поиск несуществующей группы'):
+            with pytest.raises(Http404):
+                lookups.groups.get_or_404('nope')
+
+    def test_save_and_delete_invalidate(self, group, user):
+        with pytest.raises(Http404):
+            lookups.groups.get_or_404('new-slug')
+        lookups.groups.get_or_404(group.slug)
+        group.slug = 'new-slug'
+        group.save()
+        assert lookups.groups.get_or_404('new-slug') == group, (
+            'Проверьте, что сохранение группы сбрасывает отрицательный кеш'
+        )
+        with pytest.raises(Http404):
+            lookups.groups.get_or_404('test-link')
+        lookups.authors.get_or_404(user.username)
+        user.delete()
+        with pytest.raises(Http404):
+            lookups.authors.get_or_404(user.username)
+
+    def test_cached_author_has_no_stale_relations(self, user):
+        Post.objects.create(text='Первый', author=user)
+        assert lookups.authors.get_or_404(user.username).stats.posts_count == 1
+        cached = lookups.authors.get_or_404(user.username)
+        cached.stats
+        Post.objects.create(text='Второй', author=user)
+        assert lookups.authors.get_or_404(user.username).stats.posts_count == 2, (
+            'Проверьте, что связанные объекты не хранятся в кеше вместе с автором'
+        )
+
+
+def test_pages_use_lookups(settings, client, few_posts_with_group):
+    settings.PAGE_CACHE_ENABLED = False
+    group = few_posts_with_group.group
+    url = reverse('posts:group_list', args=[group.slug])
+    client.get(url)
+    with assert_max_queries(1, url):
+        assert client.get(url).status_code == 200
+    assert Client().get('/profile/nobody/').status_code == 404
+    with assert_max_queries(0, '/profile/nobody/'):
+        assert Client().get('/profile/nobody/').status_code == 404
+
+
+def test_lookup_ratios_in_metrics(client, group):
+    lookups.groups.get_or_404(group.slug)
+    text = client.get('/core/metrics/').content.decode()
+    assert 'yatube_cache_misses_total{cache="group_lookup"}' in text
+    assert 'yatube_cache_hits_total{cache="author_lookup"}' in text
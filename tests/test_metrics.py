@@ -0,0 +1,115 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+from core import metrics
+from django.test import Client
+from posts.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _value(text, line_start):
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+class TestMetrics:
+
+    def test_routes_writes_and_caches(self, user, post):
+        client = Client()
+        before = client.get('/core/metrics/').content.decode()
+        client.get('/')
+        client.get('/')
+        client.get(f'/posts/{post.pk}/')
+        Post.objects.create(text='Новый', author=user)
+        text = client.get('/core/metrics/').content.decode()
+
+        index = 'yatube_requests_total{route="posts:index",method="GET",status="200"}'
+        assert _value(text, index) - _value(before, index) == 2, (
+            'Проверьте, что запросы считаются по имени маршрута'
+        )
+        count = 'yatube_request_duration_seconds_count{route="posts:post_detail"}'
+        assert _value(text, count) - _value(before, count) == 1
+        assert re.search(
+            r'yatube_request_duration_seconds_bucket\{route="posts:index",le="\+Inf"\}', text
+        )
+        assert 'yatube_db_queries_total{route="posts:index"}' in text
+        created = 'yatube_post_writes_total{operation="create"}'
+        assert _value(text, created) - _value(before, created) == 1
+        assert 'yatube_cache_hits_total{cache="page_cache"}' in text
+
+    def test_token(self, settings):
+        settings.METRICS_TOKEN = 'secret'
+        assert Client().get('/core/metrics/').status_code == 403
+        response = Client().get('/core/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
+
+    def test_multiprocess_files_are_summed(self, settings, tmp_path):
+        settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+        registry = metrics.Registry()
+        counter = registry.counter('test_total', 'Тест.', ('kind',))
+        histogram = registry.histogram('test_seconds', 'Тест.', buckets=(1,))
+        counter.inc(kind='a')
+        histogram.observe(0.5)
+        other = registry.state()
+        other['test_total']['values'] = [[['a'], 4], [['b'], 1]]
+        other['test_seconds']['values'] = [[[], [0, 3.0, 1]]]
+        (tmp_path / f'{os.getppid()}.json').write_text(json.dumps(other))
+
+        text = metrics.render(registry.collect())
+        assert 'test_total{kind="a"} 5' in text
+        assert 'test_total{kind="b"} 1' in text
+        assert 'test_seconds_bucket{le="1.0"} 1' in text
+        assert 'test_seconds_bucket{le="+Inf"} 2' in text
+        assert 'test_seconds_sum 3.5' in text
+        assert 'test_seconds_count 2' in text
+
+    def test_dead_process_files_are_pruned(self, settings, tmp_path):
+        settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+        dead = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True, check=True)
+        (tmp_path / f'{dead.stdout.strip()}.json').write_text('{}')
+        (tmp_path / f'{os.getppid()}.json').write_text('{}')
+        metrics.Registry().flush()
+        assert sorted(path.name for path in tmp_path.glob('*.json')) == sorted(
+            [f'{os.getppid()}.json', f'{os.getpid()}.json']
+        ), 'Проверьте, что файлы завершившихся процессов удаляются при старте'
+
+    def test_dead_process_counts_are_kept(self, settings, tmp_path):
+        settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+        dead = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True, check=True)
+        registry = metrics.Registry()
+        registry.counter('test_total', 'Тест.').inc(3)
+        registry.histogram('test_seconds', 'Тест.', buckets=(1,)).observe(0.5)
+        state = registry.state()
+        state['test_temperature'] = {
+            'type': 'gauge', 'help': 'Тест.', 'labels': [], 'values': [[[], 7]],
+        }
+        (tmp_path / f'{dead.stdout.strip()}.json').write_text(json.dumps(state))
+        before = metrics.render(metrics.Registry().collect())
+        assert 'test_total 3' in before
+
+        after = metrics.render(metrics.Registry().collect())
+        assert not (tmp_path / f'{dead.stdout.strip()}.json').exists()
+        assert 'test_total 3' in after, (
+            'Проверьте, что счётчики завершившихся процессов не пропадают из суммы'
+        )
+        assert 'test_seconds_count 1' in after
+        assert 'test_temperature' not in after, (
+            'Датчики завершившихся процессов не должны попадать в архив'
+        )
+
+    def test_unknown_method_is_other(self):
+        Client().generic('BREW', '/')
+        text = Client().get('/core/metrics/').content.decode()
+        assert 'method="BREW"' not in text, (
+            'Проверьте, что произвольные методы не порождают новые ряды метрик'
+        )
+        assert 'method="other"' in text
@@ -0,0 +1,164 @@
+import pytest
+from core import holes
+from core.middleware import HolePunchMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponseNotFound
+from django.test import Client
+from posts import page_cache
+from posts.models import Post
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+def _rendered(response, template_name):
+    return template_name in [template.name for template in response.templates]
+
+
+class TestAnonymousPageCache:
+
+    def test_conditional_get_returns_304(self, client, post_with_group):
+        url = f'/posts/{post_with_group.pk}/'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.has_header('ETag') and response.has_header('Last-Modified'), (
+            'Проверьте, что страница отдаёт заголовки ETag и Last-Modified'
+        )
+        again = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert again.status_code == 304, 'Проверьте, что на совпавший ETag отдаётся 304'
+        again = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert again.status_code == 304
+
+    def test_cache_hit_skips_templates_and_follows_writes(self, client, post_with_group):
+        url = f'/group/{post_with_group.group.slug}/'
+        first = client.get(url)
+        cached = client.get(url)
+        assert not _rendered(cached, 'posts/group_list.html'), (
+            'Проверьте, что повторный запрос берётся из кеша'
+        )
+        assert cached.content == first.content
+
+        Post.objects.create(
+            text='Свежий пост группы', author=post_with_group.author,
+            group=post_with_group.group,
+        )
+        fresh = client.get(url)
+        assert 'Свежий пост группы' in fresh.content.decode(), (
+            'Проверьте, что новый пост в группе сбрасывает кеш её страницы'
+        )
+        assert client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code == 200
+
+    def test_unrelated_write_keeps_page(self, client, post_with_group, group):
+        url = f'/profile/{post_with_group.author.username}/'
+        client.get(url)
+        other = type(post_with_group.author).objects.create(username='other')
+        Post.objects.create(text='Чужой пост', author=other)
+        assert not _rendered(client.get(url), 'posts/profile.html'), (
+            'Проверьте, что пост другого автора не сбрасывает кеш профиля'
+        )
+
+    def test_logged_in_users_share_body_with_own_holes(self, user_client, user, post_with_group):
+        url = f'/posts/{post_with_group.pk}/'
+        anonymous = Client().get(url)
+        html = anonymous.content.decode()
+        assert 'Войти' in html and 'редактировать запись' not in html
+
+        response = user_client.get(url)
+        assert not _rendered(response, 'posts/post_detail.html'), (
+            'Проверьте, что авторизованный пользователь получает страницу из общего кеша'
+        )
+        html = response.content.decode()
+        assert f'Пользователь: {user.username}' in html and 'Войти' not in html, (
+            'Проверьте, что шапка заполняется для текущего пользователя'
+        )
+        assert 'редактировать запись' in html, (
+            'Проверьте, что автор видит кнопку редактирования в закешированной странице'
+        )
+        assert '<!--hole:' not in html
+        assert response['ETag'] != anonymous['ETag']
+        assert user_client.get(url, HTTP_IF_NONE_MATCH=anonymous['ETag']).status_code == 200
+
+    def test_relogin_changes_etag(self, client, user, post_with_group):
+        url = f'/posts/{post_with_group.pk}/'
+        client.force_login(user)
+        before = client.get(url)
+        client.logout()
+        client.force_login(user)
+        after = client.get(url, HTTP_IF_NONE_MATCH=before['ETag'])
+        assert after.status_code == 200, (
+            'Проверьте, что после нового входа не отдаётся 304 со старым csrf-токеном'
+        )
+        assert after['ETag'] != before['ETag']
+
+
+class TestFeedVersions:
+
+    def test_versions_never_go_back(self):
+        page_cache.bump_feeds(['feed'])
+        version = page_cache.feed_versions(['feed'])
+        modified = page_cache.feeds_modified(['feed'])
+        page_cache.bump_feeds(['feed'], when=modified - 3600)
+        assert page_cache.feed_versions(['feed']) != version
+        assert list(page_cache.feed_versions(['feed']).values())[0] > list(version.values())[0], (
+            'Проверьте, что версия ленты не уменьшается'
+        )
+        assert page_cache.feeds_modified(['feed']) == modified, (
+            'Проверьте, что запись со старым временем не откатывает Last-Modified'
+        )
+
+    def test_unknown_modified_is_not_sent(self, client, post_with_group):
+        cache.clear()
+        response = client.get(f'/posts/{post_with_group.pk}/')
+        assert response.has_header('ETag')
+        assert not response.has_header('Last-Modified'), (
+            'Проверьте, что без времени изменения ленты Last-Modified не выдумывается'
+        )
+
+    def test_post_detail_follows_group_rename(self, client, post_with_group):
+        url = f'/posts/{post_with_group.pk}/'
+        client.get(url)
+        group = post_with_group.group
+        group.title = 'Новое название'
+        group.save()
+        assert 'Новое название' in client.get(url).content.decode(), (
+            'Проверьте, что страница поста зависит от ленты группы'
+        )
+
+    def test_author_rename_renders_fresh_pages(self, client, post_with_group):
+        author = post_with_group.author
+        urls = ['/', f'/profile/{author.username}/',
+                f'/group/{post_with_group.group.slug}/', f'/posts/{post_with_group.pk}/']
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        author.first_name, author.last_name = 'Новое', 'Имя'
+        author.save()
+        for url in urls:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == 200, (
+                f'Проверьте, что правка имени автора сбрасывает кеш {url}'
+            )
+            assert 'Новое Имя' in response.content.decode()
+
+    def test_group_slug_change_renders_fresh_profile(self, client, post_with_group):
+        url = f'/profile/{post_with_group.author.username}/'
+        client.get(url)
+        group = post_with_group.group
+        group.slug = 'novyi-slug'
+        group.save()
+        response = client.get(url)
+        assert _rendered(response, 'posts/profile.html'), (
+            'Проверьте, что смена slug группы сбрасывает кеш профилей её авторов'
+        )
+        assert '/group/novyi-slug/' in response.content.decode()
+
+
+def test_holes_filled_in_error_pages(rf):
+    request = rf.get('/missing/')
+    request.user = AnonymousUser()
+    middleware = HolePunchMiddleware(
+        lambda request: HttpResponseNotFound(holes.marker('header_auth'))
+    )
+    html = middleware(request).content.decode()
+    assert holes.MARKER_PREFIX not in html, (
+        'Проверьте, что дырки заполняются и в ответах с ошибкой'
+    )
+    assert 'Войти' in html
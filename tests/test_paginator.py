@@ -50,3 +50,58 @@ class TestGroupPaginatorView:
             'Проверьте, что переменная `paginator` объекта `page_obj`'
             ' на странице `/profile/<username>/` типа `Paginator`'
         )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCachedCount:
+
+    def test_count_comes_from_cache_and_follows_writes(self, client, settings, few_posts_with_group):
+        settings.PAGE_CACHE_ENABLED = False
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from posts.models import Post
+
+        client.get('/')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/')
+        assert not any('COUNT(' in query['sql'] for query in queries.captured_queries), (
+            'Проверьте, что пагинатор берёт число постов из кеша'
+        )
+        assert response.context['page_obj'].paginator.count == 20
+
+        Post.objects.create(text='Новый пост', author=few_posts_with_group.author)
+        few_posts_with_group.delete()
+        few_posts_with_group.group.posts.first().delete()
+        response = client.get('/')
+        assert response.context['page_obj'].paginator.count == 19, (
+            'Проверьте, что создание и удаление постов сдвигают закешированное число'
+        )
+        response = client.get(f'/group/{few_posts_with_group.group.slug}/')
+        assert response.context['page_obj'].paginator.count == 18
+
+
+class TestElidedPageRange:
+
+    def test_window_does_not_grow_with_pages(self):
+        from posts.utils import FeedPaginator
+
+        paginator = FeedPaginator(range(100000), 10)
+        page = paginator.get_page(500)
+        assert page.elided_page_range == [1, '…', 498, 499, 500, 501, 502, '…', 10000], (
+            'Проверьте, что пагинатор выводит первую, последнюю страницы и окно вокруг текущей'
+        )
+        assert paginator.get_page(1).elided_page_range == [1, 2, 3, '…', 10000]
+        assert paginator.get_page(10000).elided_page_range == [1, '…', 9998, 9999, 10000]
+        assert FeedPaginator(range(30), 10).get_page(2).elided_page_range == [1, 2, 3]
+
+    @pytest.mark.django_db
+    def test_template_renders_window(self, client, settings, mixer, user):
+        from posts.models import Post
+
+        settings.CONST = 1
+        mixer.cycle(40).blend(Post, author=user)
+        html = client.get('/?page=20').content.decode()
+        assert html.count('class="page-link"') < 15, (
+            'Проверьте, что шаблон пагинатора не выводит ссылку на каждую страницу'
+        )
+        assert '?page=40' in html and '?page=21' in html
@@ -0,0 +1,95 @@
+import pytest
+from django.http import Http404
+from django.test import Client
+from django.urls import reverse
+from core import jobs
+from core.models import Job
+from posts import post_cache
+from posts.models import Post, User
+
+from tests.utils import assert_max_queries
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestPostCache:
+
+    def test_get_many_hydrates_page_in_one_round_trip(self, mixer, user, group):
+        posts = mixer.cycle(5).blend(Post, author=user, group=group)
+        pks = [post.pk for post in posts]
+        post_cache.get_many(pks[:2])
+        with assert_max_queries(1, 'посты, которых нет в кеше'):
+            found = post_cache.get_many(pks)
+        with assert_max_queries(0, 'посты из кеша'):
+            found = post_cache.get_many(pks)
+            titles = {post.group.title for post in found.values()}
+            names = {post.author.username for post in found.values()}
+        assert set(found) == set(pks)
+        assert titles == {group.title} and names == {user.username}, (
+            'Проверьте, что в кеше лежат снимки автора и группы поста'
+        )
+
+    def test_missing_post(self):
+        assert post_cache.get_many([999]) == {}
+        with pytest.raises(Http404):
+            post_cache.get_or_404(999)
+
+    def test_edit_and_delete_invalidate(self, post, group):
+        post_cache.get_or_404(post.pk)
+        post.text = 'Исправлено'
+        post.group = group
+        post.save()
+        cached = post_cache.get_or_404(post.pk)
+        assert cached.text == 'Исправлено' and cached.group.slug == group.slug
+        post.delete()
+        with pytest.raises(Http404):
+            post_cache.get_or_404(post.pk)
+
+    def test_author_and_group_edits_invalidate(self, settings, post_with_group, user, group):
+        settings.JOBS_EAGER = False
+        post_cache.get_or_404(post_with_group.pk)
+        user.first_name = 'Новое'
+        user.save()
+        group.title = 'Новое название'
+        group.save()
+        assert post_cache.get_or_404(post_with_group.pk).author.first_name != 'Новое', (
+            'Проверьте, что правка автора не сбрасывает снимки в запросе, '
+            'а ставит задание в очередь'
+        )
+        while jobs.run_batch('worker', batch_size=10):
+            pass
+        cached = post_cache.get_or_404(post_with_group.pk)
+        assert cached.author.first_name == 'Новое', (
+            'Проверьте, что задание сбрасывает снимки в постах автора'
+        )
+        assert cached.group.title == 'Новое название'
+        group.delete()
+        assert post_cache.get_or_404(post_with_group.pk).group is None, (
+            'Проверьте, что удаление группы сбрасывает записи её постов'
+        )
+
+    def test_login_and_signup_do_not_queue(self, settings, user):
+        settings.JOBS_EAGER = False
+        user.save(update_fields=['last_login'])
+        User.objects.create_user('новичок')
+        assert not Job.objects.filter(name='posts.forget_posts').exists()
+
+def test_post_detail_uses_post_cache(settings, post_with_group):
+    settings.PAGE_CACHE_ENABLED = False
+    url = reverse('posts:post_detail', args=[post_with_group.pk])
+    client = Client()
+    client.get(url)
+    with assert_max_queries(0, url):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert post_with_group.text in response.content.decode()
+
+
+def test_admin_edit_invalidates(admin_client, post):
+    post_cache.get_or_404(post.pk)
+    response = admin_client.post(
+        f'/admin/posts/post/{post.pk}/change/',
+        {'text': 'Правка из админки', 'author': post.author_id, 'group': ''},
+    )
+    assert response.status_code == 302
+    assert post_cache.get_or_404(post.pk).text == 'Правка из админки'
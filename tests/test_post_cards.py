@@ -0,0 +1,34 @@
+import pytest
+from core.cache_stats import cache_stats
+from posts.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestPostCardCache:
+
+    def test_cards_are_reused_and_invalidated_by_edit(self, client, settings, post_with_group):
+        settings.PAGE_CACHE_ENABLED = False
+        stats = cache_stats('post_cards')
+        client.get('/')
+        hits = stats.hits
+        client.get('/')
+        assert stats.hits == hits + 1, 'Проверьте, что карточка поста берётся из кеша'
+
+        post = Post.objects.get(pk=post_with_group.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        misses = stats.misses
+        html = client.get('/').content.decode()
+        assert stats.misses == misses + 1
+        assert 'Исправленный текст' in html, (
+            'Проверьте, что после правки поста карточка отрисовывается заново'
+        )
+
+    def test_cache_stats_view_is_staff_only(self, user_client, user):
+        assert user_client.get('/core/cache-stats/').status_code == 302
+        user.is_staff = True
+        user.save()
+        response = user_client.get('/core/cache-stats/')
+        assert response.status_code == 200
+        assert 'post_cards' in response.json()
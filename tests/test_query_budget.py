@@ -0,0 +1,78 @@
+import pytest
+from django.urls import reverse
+from posts import urls as posts_urls
+
+from tests.utils import assert_max_queries
+
+pytestmark = [pytest.mark.django_db]
+
+# Максимум SQL-запросов на страницу для авторизованного пользователя
+# (одна из них — пользователь при первом запросе; сессия берётся из кеша;
+# на страницах группы и профиля ещё одна — подписки пользователя для кнопки
+# подписки, тоже только при первом запросе). У подписки и отписки в бюджет
+# входят транзакция (SAVEPOINT и RELEASE в тестах) и запись сессии с
+# тремя запросами: holes.changed() меняет вариант дырок.
+# Рост числа запросов с ростом числа постов на странице — это N+1, и тест
+# должен его ловить.
+QUERY_BUDGETS = {
+    'index': 3,
+    'group_list': 4,
+    'profile': 4,
+    'post_detail': 2,
+    'post_create': 2,
+    'post_edit': 3,
+    'search': 4,
+    'follow_index': 3,
+    'profile_follow': 2,
+    'profile_unfollow': 5,
+    'group_follow': 10,
+    'group_unfollow': 6,
+}
+# Действия отвечают на POST перенаправлением.
+ACTIONS = {'profile_follow', 'profile_unfollow', 'group_follow', 'group_unfollow'}
+
+
+def _url_kwargs(name, post):
+    return {
+        'index': {},
+        'group_list': {'slug': post.group.slug},
+        'profile': {'username': post.author.username},
+        'post_detail': {'post_id': post.pk},
+        'post_create': {},
+        'post_edit': {'post_id': post.pk},
+        'search': {},
+        'follow_index': {},
+        'profile_follow': {'username': post.author.username},
+        'profile_unfollow': {'username': post.author.username},
+        'group_follow': {'slug': post.group.slug},
+        'group_unfollow': {'slug': post.group.slug},
+    }[name]
+
+
+def test_every_posts_view_has_budget():
+    names = {pattern.name for pattern in posts_urls.urlpatterns}
+    assert names == set(QUERY_BUDGETS), (
+        'Добавьте бюджет SQL-запросов для каждого маршрута из posts/urls.py'
+    )
+
+
+@pytest.mark.parametrize('name', sorted(QUERY_BUDGETS))
+def test_view_query_budget(name, user_client, few_posts_with_group):
+    url = reverse(f'posts:{name}', kwargs=_url_kwargs(name, few_posts_with_group))
+    if name == 'search':
+        url += '?q=' + few_posts_with_group.text.split()[0]
+    if name in ACTIONS:
+        with assert_max_queries(QUERY_BUDGETS[name], url):
+            response = user_client.post(url)
+        assert response.status_code == 302
+        return
+    with assert_max_queries(QUERY_BUDGETS[name], url):
+        response = user_client.get(url)
+    assert response.status_code == 200
+
+
+def test_authenticated_hot_path_has_no_auth_queries(user_client, post):
+    user_client.get(reverse('posts:post_create'))
+    with assert_max_queries(0, 'повторный запрос авторизованного пользователя'):
+        response = user_client.get(reverse('posts:post_create'))
+    assert response.status_code == 200
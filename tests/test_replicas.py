@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+from core.db_router import PRIMARY_COOKIE
+from django.db import connection, connections
+from django.test import Client
+from posts.models import Post
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """Снимок тестовой базы в отдельном файле — реплика, которая отстала."""
+
+    def snapshot():
+        connection.ensure_connection()
+        target = sqlite3.connect(str(tmp_path / 'replica.sqlite3'))
+        connection.connection.backup(target)
+        target.close()
+
+    connections.databases['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield snapshot
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
+
+
+class TestReplicaReads:
+
+    def test_author_sees_own_edit(self, settings, replica, user_client, post):
+        settings.PAGE_CACHE_ENABLED = False
+        replica()
+        response = user_client.post(
+            f'/posts/{post.pk}/edit/', data={'text': 'Новый текст'}
+        )
+        assert response.status_code == 302
+        assert PRIMARY_COOKIE in response.cookies, (
+            'Проверьте, что после записи пользователь закрепляется за основной базой'
+        )
+
+        anonymous = Client().get(f'/posts/{post.pk}/').content.decode()
+        assert 'Тестовый пост 1' in anonymous, (
+            'Проверьте, что публичные страницы читаются из реплики'
+        )
+        own = user_client.get(f'/posts/{post.pk}/').content.decode()
+        assert 'Новый текст' in own, (
+            'Проверьте, что автор сразу после правки видит её'
+        )
+
+        # Пост автор теперь получает из кеша постов; что окно закончилось,
+        # видно по ленте профиля.
+        user_client.cookies[PRIMARY_COOKIE] = '0'
+        Post.objects.filter(pk=post.pk).update(text='Ещё новее')
+        stale = user_client.get(f'/profile/{post.author.username}/').content.decode()
+        assert 'Тестовый пост 1' in stale
+
+    def test_writes_and_forms_use_primary(self, replica, user_client, post):
+        replica()
+        Post.objects.filter(pk=post.pk).update(text='Только в основной')
+        response = user_client.get(f'/posts/{post.pk}/edit/')
+        assert 'Только в основной' in response.content.decode(), (
+            'Проверьте, что формы читают из основной базы'
+        )
+
+    def test_stale_replica_page_not_cached(self, replica, client, post):
+        replica()
+        post.text = 'Свежий'
+        post.save()
+        Client().get(f'/posts/{post.pk}/')
+        client.cookies[PRIMARY_COOKIE] = '9999999999'
+        assert 'Свежий' in client.get(f'/posts/{post.pk}/').content.decode(), (
+            'Проверьте, что страница, прочитанная из отставшей реплики, '
+            'не попадает в общий кеш'
+        )
+
+    def test_stale_replica_post_not_cached(self, settings, replica, post):
+        settings.PAGE_CACHE_ENABLED = False
+        replica()
+        post.text = 'Свежий'
+        post.save()
+        assert 'Тестовый пост 1' in Client().get(f'/posts/{post.pk}/').content.decode()
+        settings.DATABASE_REPLICAS = []
+        assert 'Свежий' in Client().get(f'/posts/{post.pk}/').content.decode(), (
+            'Проверьте, что пост, прочитанный из отставшей реплики сразу после '
+            'записи, не попадает в кеш постов'
+        )
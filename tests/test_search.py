@@ -0,0 +1,135 @@
+from io import StringIO
+
+import pytest
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory
+from posts import search
+from posts.models import Post
+from posts.search import SearchResults
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _found(client, query):
+    response = client.get('/search/', {'q': query})
+    assert response.status_code == 200
+    return [post.pk for post in response.context['page_obj']]
+
+
+class TestPostSearch:
+
+    def test_index_follows_create_edit_delete(self, client, user):
+        post = Post.objects.create(text='Рецепт борща со сметаной', author=user)
+        Post.objects.create(text='Прогулка по лесу', author=user)
+        assert _found(client, 'борщ') == [post.pk], (
+            'Проверьте, что поиск находит пост по слову из текста'
+        )
+
+        post.text = 'Рецепт окрошки'
+        post.save()
+        assert _found(client, 'борщ') == []
+        assert _found(client, 'окрошки') == [post.pk], (
+            'Проверьте, что правка поста обновляет полнотекстовый индекс'
+        )
+
+        post.delete()
+        assert _found(client, 'окрошки') == []
+
+    def test_ranked_and_paginated(self, client, mixer, user):
+        mixer.cycle(12).blend(Post, author=user, text='кот гулял по длинной улице весь день')
+        best = Post.objects.create(text='кот и кот', author=user)
+        response = client.get('/search/', {'q': 'кот'})
+        page_obj = response.context['page_obj']
+        assert page_obj.paginator.count == 13
+        assert page_obj[0].pk == best.pk, 'Проверьте, что результаты упорядочены по релевантности'
+        assert 'q=%D0%BA%D0%BE%D1%82&amp;page=2' in response.content.decode(), (
+            'Проверьте, что ссылки пагинатора сохраняют поисковый запрос'
+        )
+
+    def test_query_syntax_is_escaped(self, client, user):
+        Post.objects.create(text='NEAR AND OR', author=user)
+        assert len(_found(client, '"AND* (OR')) == 1
+
+    def test_admin_search_uses_index(self, user, post):
+        admin_model = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset, _ = admin_model.get_search_results(
+            request, Post.objects.all(), 'Тестовый'
+        )
+        assert 'posts_post_fts' in str(queryset.query)
+        assert list(queryset) == [post]
+
+    def test_rebuild_command(self, user, post):
+        call_command('rebuild_search_index', stdout=StringIO())
+        assert SearchResults('Тестовый').count() == 1
+
+    def test_rebuild_in_batches(self, mixer, user, post):
+        mixer.cycle(4).blend(Post, author=user, text='Тестовый пакетный')
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        assert out.getvalue().count(' постов, id ') == 3, (
+            'Проверьте, что индекс перестраивается пачками по --batch-size'
+        )
+        assert 'Проиндексировано: 5' in out.getvalue()
+        assert SearchResults('Тестовый').count() == 5
+        assert SearchResults('пакетный').count() == 4, (
+            'Переиндексированный пост не должен попадать в индекс дважды'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) "
+                "VALUES ('integrity-check')"
+            )
+
+    def test_rebuild_after_edits(self, user, post):
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        post.text = 'Исправленный'
+        post.save()
+        post_2 = Post.objects.create(text='Тестовый второй', author=user)
+        post_2.delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        assert SearchResults('Тестовый').count() == 0, (
+            'После перестройки в индексе остался старый текст'
+        )
+        assert SearchResults('Исправленный').count() == 1
+
+
+class TestDeferredIndex:
+
+    def _has_trigger(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+                'AND name = %s',
+                [search.INSERT_TRIGGER],
+            )
+            return cursor.fetchone() is not None
+
+    def test_keeps_trigger_on_live_db(self, user, post):
+        with search.deferred_index():
+            assert self._has_trigger(), (
+                'В базе с постами триггер индексации снимать нельзя'
+            )
+            Post.objects.create(text='Тестовый второй', author=user)
+            assert SearchResults('второй').count() == 1
+
+    def test_throwaway_db_is_rebuilt_on_exit(self, user, post):
+        with search.deferred_index(throwaway=True):
+            assert not self._has_trigger()
+            new = Post.objects.create(text='Новый', author=user)
+            new.text = 'Правленый'
+            new.save()
+            post.delete()
+        assert self._has_trigger()
+        assert SearchResults('Правленый').count() == 1
+        assert SearchResults('Новый').count() == 0
+        assert SearchResults('Тестовый').count() == 0
+
+    def test_missing_trigger_fails(self, user):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.INSERT_TRIGGER}')
+        with pytest.raises(LookupError):
+            with search.deferred_index(throwaway=True):
+                pass
@@ -0,0 +1,59 @@
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from posts.models import AuthorStats, Group, Post
+from posts.search import SearchResults
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _seed(prefix, seed=1):
+    call_command(
+        'seed_yatube', '--until', '2020-01-01', users=20, groups=5,
+        posts=600, seed=seed, prefix=prefix, chunk_size=250,
+        stdout=StringIO(),
+    )
+    return list(
+        Post.objects.filter(author__username__startswith=f'{prefix}_')
+        .order_by('pub_date', 'id')
+        .values_list('text', 'pub_date', 'author__username', 'group__slug')
+    )
+
+
+class TestSeedYatube:
+
+    def test_deterministic_by_seed(self):
+        first = _seed('a')
+        second = _seed('b')
+        assert len(first) == 600
+        assert [
+            (text, date, author[1:], group and group[1:])
+            for text, date, author, group in first
+        ] == [
+            (text, date, author[1:], group and group[1:])
+            for text, date, author, group in second
+        ], 'Проверьте, что один и тот же seed даёт одни и те же данные'
+        assert _seed('c', seed=2) != first
+
+    def test_skewed_and_counted(self):
+        posts = _seed('a')
+        by_author = Counter(author for _, _, author, _ in posts)
+        assert by_author.most_common(1)[0][1] > 600 / 20 * 3, (
+            'Проверьте, что у нескольких авторов намного больше постов'
+        )
+        assert sum(1 for *_, group in posts if group is None) > 100
+        assert sum(
+            stats.posts_count for stats in AuthorStats.objects.all()
+        ) == 600
+        assert sum(group.posts_count for group in Group.objects.all()) == (
+            Post.objects.exclude(group=None).count()
+        )
+
+    def test_posts_are_searchable(self):
+        posts = _seed('a')
+        word = posts[0][0].split()[0]
+        assert SearchResults(word).count() > 0, (
+            'Проверьте, что засеянные посты попадают в полнотекстовый индекс'
+        )
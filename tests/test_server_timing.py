@@ -0,0 +1,53 @@
+import json
+import logging
+import re
+
+import pytest
+from django.test import Client
+
+pytestmark = [pytest.mark.django_db]
+
+TIMING_RE = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", tpl;dur=([\d.]+), total;dur=([\d.]+)'
+)
+
+
+class TestServerTiming:
+
+    def test_header_breaks_down_request(self, settings, post):
+        settings.PAGE_CACHE_ENABLED = False
+        settings.DEBUG = True
+        response = Client().get(f'/posts/{post.pk}/')
+        match = TIMING_RE.fullmatch(response['Server-Timing'])
+        assert match, 'Проверьте, что ответ содержит заголовок Server-Timing'
+        queries, template, total = match.groups()
+        assert int(queries) > 0
+        assert 0 < float(template) <= float(total)
+
+    def test_slow_request_logged_with_profile(self, settings, tmp_path, caplog, post):
+        settings.SLOW_REQUEST_MS = 0
+        settings.PROFILE_SAMPLE_RATE = 1
+        settings.PROFILE_DIR = str(tmp_path)
+        settings.PROFILE_KEEP = 2
+        with caplog.at_level(logging.WARNING, logger='yatube.slow_requests'):
+            for _ in range(3):
+                Client().get('/')
+        records = [json.loads(record.message) for record in caplog.records]
+        assert len(records) == 3, 'Проверьте, что медленные запросы попадают в журнал'
+        assert records[0]['path'] == '/'
+        assert records[0]['status'] == 200
+        assert {'queries', 'db_ms', 'template_ms', 'total_ms'} <= set(records[0])
+        assert len(list(tmp_path.glob('*.prof'))) == 2, (
+            'Проверьте, что сохраняются только PROFILE_KEEP самых медленных профилей'
+        )
+
+    def test_header_only_for_staff(self, settings, admin_client, post):
+        settings.DEBUG = False
+        assert 'Server-Timing' not in Client().get('/'), (
+            'Проверьте, что анонимный посетитель не видит тайминги сервера'
+        )
+        assert 'Server-Timing' in admin_client.get('/')
+
+    def test_disabled(self, settings):
+        settings.PROFILING_ENABLED = False
+        assert 'Server-Timing' not in Client().get('/')
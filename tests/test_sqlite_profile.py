@@ -0,0 +1,42 @@
+import pytest
+from core.sqlite import apply_pragmas
+from django.db import connections
+
+
+@pytest.fixture
+def fresh_connection(tmp_path, django_db_blocker):
+    connections.databases['profile'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'profile.sqlite3'),
+    }
+    with django_db_blocker.unblock():
+        yield connections['profile']
+        connections['profile'].close()
+    del connections['profile']
+    del connections.databases['profile']
+
+
+def _pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+class TestSqliteProfile:
+
+    def test_production_pragmas_on_new_connections(self, settings, fresh_connection):
+        settings.SQLITE_PRAGMAS = settings.SQLITE_PRODUCTION_PRAGMAS
+        assert _pragma(fresh_connection, 'journal_mode') == 'wal', (
+            'Проверьте, что продакшен-профиль включает WAL'
+        )
+        assert _pragma(fresh_connection, 'synchronous') == 1
+        assert _pragma(fresh_connection, 'busy_timeout') == 5000
+        assert _pragma(fresh_connection, 'cache_size') == -64 * 1024
+
+    def test_default_profile_leaves_connection_alone(self, fresh_connection):
+        assert _pragma(fresh_connection, 'journal_mode') == 'delete'
+
+    def test_rejects_unsafe_pragma(self, fresh_connection):
+        fresh_connection.ensure_connection()
+        with pytest.raises(ValueError):
+            apply_pragmas(fresh_connection, {'journal_mode': 'wal; DROP TABLE x'})
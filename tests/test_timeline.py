@@ -0,0 +1,134 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from posts import timeline
+from posts.models import AuthorStats, Follow, Group, Post, TimelineEntry
+
+from tests.utils import assert_max_queries
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def author():
+    return get_user_model().objects.create(username='author')
+
+
+class TestFollow:
+
+    def test_follow_backfills_and_counts(self, user, author, settings):
+        settings.TIMELINE_BACKFILL = 3
+        for i in range(5):
+            Post.objects.create(text=f'Пост {i}', author=author)
+        assert timeline.follow(user, author=author)
+        assert not timeline.follow(user, author=author), (
+            'Проверьте, что повторная подписка ничего не меняет'
+        )
+        assert TimelineEntry.objects.filter(user=user).count() == 3, (
+            'Проверьте, что при подписке в ленту попадают последние посты автора'
+        )
+        assert AuthorStats.objects.get(author=author).followers_count == 1
+
+    def test_unfollow_keeps_posts_of_other_follows(self, user, author, group):
+        in_group = Post.objects.create(text='В группе', author=author, group=group)
+        Post.objects.create(text='Без группы', author=author)
+        timeline.follow(user, author=author)
+        timeline.follow(user, group=group)
+        assert Group.objects.get(pk=group.pk).followers_count == 1
+        assert timeline.unfollow(user, author=author)
+        assert list(
+            TimelineEntry.objects.filter(user=user).values_list('post', flat=True)
+        ) == [in_group.pk], (
+            'Проверьте, что после отписки в ленте остаются посты других подписок'
+        )
+        assert AuthorStats.objects.get(author=author).followers_count == 0
+
+    def test_fan_out_in_batches(self, author, group):
+        users = [
+            get_user_model().objects.create(username=f'reader{i}') for i in range(7)
+        ]
+        for reader in users[:5]:
+            Follow.objects.create(user=reader, author=author)
+        for reader in users[3:]:
+            Follow.objects.create(user=reader, group=group)
+        post = Post.objects.create(text='Новый пост', author=author, group=group)
+        timeline.fan_out(post.pk, batch_size=2)
+        assert TimelineEntry.objects.filter(post=post).count() == 7, (
+            'Проверьте, что пост получают подписчики автора и группы, каждый один раз'
+        )
+
+    def test_popular_author_is_pulled(self, user, author, settings):
+        settings.FANOUT_PULL_THRESHOLD = 1
+        timeline.follow(user, author=author)
+        post = Post.objects.create(text='Пост популярного автора', author=author)
+        assert timeline.fan_out(post.pk) == 0, (
+            'Проверьте, что посты популярных авторов не рассылаются'
+        )
+        page = timeline.TimelinePaginator(user, 10).cursor_page()
+        assert list(page) == [post], (
+            'Проверьте, что посты популярных авторов подмешиваются при чтении'
+        )
+
+    def test_missing_posts_do_not_shorten_page(self, user, author):
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=author) for i in range(6)
+        ]
+        timeline.follow(user, author=author)
+        # Посты пропали мимо каскада, записи ленты на них остались.
+        gone = [posts[5].pk, posts[4].pk]
+        Post.objects.filter(pk__in=gone)._raw_delete('default')
+        page = timeline.TimelinePaginator(user, 3).cursor_page()
+        assert [post.text for post in page] == ['Пост 3', 'Пост 2', 'Пост 1'], (
+            'Проверьте, что вместо пропавших постов дочитываются следующие записи'
+        )
+        assert page.has_next()
+        TimelineEntry.objects.filter(post_id__in=gone).delete()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_post_create_fans_out(user_client, user, author):
+    reader = get_user_model().objects.create(username='reader')
+    timeline.follow(reader, author=user)
+    user_client.post(reverse('posts:post_create'), {'text': 'Для подписчиков'})
+    reader_client = Client()
+    reader_client.force_login(reader)
+    response = reader_client.get(reverse('posts:follow_index'))
+    assert [post.text for post in response.context['page_obj']] == ['Для подписчиков'], (
+        'Проверьте, что новый пост попадает в ленту подписчиков автора'
+    )
+
+
+def test_follow_index_pages_by_cursor(user_client, user, author, settings):
+    settings.CONST = 3
+    timeline.follow(user, author=author)
+    for i in range(7):
+        post = Post.objects.create(text=f'Пост {i}', author=author)
+        timeline.fan_out(post.pk)
+    url = reverse('posts:follow_index')
+    texts = []
+    response = user_client.get(url)
+    while True:
+        page = response.context['page_obj']
+        texts.extend(post.text for post in page)
+        if not page.has_next():
+            break
+        # id постов из ленты и посты, которых ещё нет в кеше постов.
+        with assert_max_queries(2, url):
+            response = user_client.get(url, {'after': page.next_cursor})
+    assert texts == [f'Пост {i}' for i in reversed(range(7))]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_follow_button(user_client, user, author):
+    url = reverse('posts:profile', args=[author.username])
+    assert 'Подписаться' in user_client.get(url).content.decode()
+    response = user_client.post(reverse('posts:profile_follow', args=[author.username]))
+    assert response.status_code == 302
+    assert Follow.objects.filter(user=user, author=author).exists()
+    assert 'Отписаться' in user_client.get(url).content.decode(), (
+        'Проверьте, что кнопка подписки на закешированной странице профиля '
+        'отражает подписку пользователя'
+    )
+    assert 'Подписаться' not in Client().get(url).content.decode()
+    assert user_client.get(reverse('posts:profile_follow', args=[author.username])).status_code == 405
@@ -0,0 +1,119 @@
+import json
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from posts.bulk import bulk_create_posts
+from posts.models import AuthorStats, Group, ImportCheckpoint, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _snapshot():
+    return list(
+        Post.objects.order_by('pub_date', 'id')
+        .values_list('text', 'pub_date', 'author__username', 'group__slug')
+    )
+
+
+class TestPostTransfer:
+
+    @pytest.mark.parametrize('extension', ['jsonl', 'csv'])
+    def test_round_trip(self, tmp_path, mixer, user, group, extension):
+        mixer.cycle(7).blend(Post, author=user, group=group)
+        mixer.cycle(5).blend(Post, author=user, group=None)
+        expected = _snapshot()
+        path = str(tmp_path / f'posts.{extension}')
+        call_command('export_posts', path, stdout=StringIO())
+
+        Post.objects.all().delete()
+        out = StringIO()
+        call_command('import_posts', path, '--batch-size', '5', stdout=out)
+        assert _snapshot() == expected, (
+            'Проверьте, что выгрузка и загрузка сохраняют посты и их порядок'
+        )
+        assert 'строк/с' in out.getvalue()
+        assert AuthorStats.objects.get(author=user).posts_count == 12
+        assert Group.objects.get(pk=group.pk).posts_count == 7
+
+    def test_resume_from_checkpoint(self, tmp_path, user):
+        path = tmp_path / 'posts.jsonl'
+        rows = [
+            {'text': f'Пост {i}', 'pub_date': f'2020-01-{i + 1:02d}T00:00:00+00:00',
+             'author': user.username, 'group': ''}
+            for i in range(10)
+        ]
+        path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+        ImportCheckpoint.objects.create(name=str(path), rows=6)
+
+        call_command('import_posts', str(path), '--batch-size', '3', stdout=StringIO())
+        assert sorted(Post.objects.values_list('text', flat=True)) == [
+            'Пост 6', 'Пост 7', 'Пост 8', 'Пост 9'
+        ], 'Проверьте, что загрузка продолжается с контрольной точки'
+        assert ImportCheckpoint.objects.get(name=str(path)).rows == 10
+
+        call_command('import_posts', str(path), stdout=StringIO())
+        assert Post.objects.count() == 4
+
+    def test_unknown_references_are_skipped(self, tmp_path, user):
+        path = tmp_path / 'posts.jsonl'
+        rows = [
+            {'text': 'ok', 'pub_date': '2020-01-01T00:00:00+00:00',
+             'author': user.username, 'group': ''},
+            {'text': 'no author', 'pub_date': '2020-01-01T00:00:00+00:00',
+             'author': 'ghost', 'group': ''},
+            {'text': 'no group', 'pub_date': '2020-01-01T00:00:00+00:00',
+             'author': user.username, 'group': 'missing'},
+            {'text': 'empty author', 'pub_date': '2020-01-01T00:00:00+00:00',
+             'author': '', 'group': ''},
+            {'text': 'bad date', 'pub_date': 'вчера', 'author': user.username},
+        ]
+        path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+        err = StringIO()
+        call_command('import_posts', str(path), stdout=StringIO(), stderr=err)
+        assert list(Post.objects.values_list('text', flat=True)) == ['ok']
+        assert 'Пропущено 4' in err.getvalue()
+        assert 'Строка 4: нет автора' in err.getvalue(), (
+            'Проверьте, что пропущенные строки сообщаются с номером и причиной'
+        )
+        assert 'Строка 5: неверная дата' in err.getvalue()
+
+    def test_unreadable_lines_are_skipped(self, tmp_path, user):
+        path = tmp_path / 'posts.jsonl'
+        row = {'text': 'ok', 'pub_date': '2020-01-01T00:00:00+00:00',
+               'author': user.username, 'group': ''}
+        path.write_text(
+            json.dumps(row) + '\n'
+            + '{"text": "оборвано\n'
+            + '["не", "объект"]\n'
+            + json.dumps(dict(row, text='после')) + '\n'
+        )
+        err = StringIO()
+        call_command('import_posts', str(path), batch_size=2,
+                     stdout=StringIO(), stderr=err)
+        assert set(Post.objects.values_list('text', flat=True)) == {
+            'ok', 'после'
+        }, 'Проверьте, что битая строка не прерывает загрузку'
+        assert 'Строка 2: неверный JSON' in err.getvalue()
+        assert 'Строка 3: ожидался объект' in err.getvalue(), (
+            'Проверьте, что строка JSON не-объект пропускается с номером'
+        )
+        assert ImportCheckpoint.objects.get().rows == 4
+
+
+def test_bulk_insert_leaves_auto_pub_date_alone(user):
+    old = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def posts():
+        yield Post(text='Импорт', pub_date=old, author=user)
+        # Посты, созданные обычным путём во время вставки, как из другого
+        # потока, по-прежнему получают текущее время.
+        Post.objects.create(text='Обычный', author=user)
+        yield Post(text='Импорт 2', pub_date=old, author=user)
+
+    assert bulk_create_posts(posts(), batch_size=1) == 2
+    assert Post.objects.get(text='Импорт').pub_date == old
+    assert Post.objects.get(text='Обычный').pub_date > old, (
+        'Проверьте, что массовая вставка не отключает auto_now_add у модели'
+    )
@@ -0,0 +1,53 @@
+import pytest
+from core.lru import TTLCache
+from django.urls import reverse
+from posts.models import AuthorStats
+from users.backends import CachedModelBackend
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestUserCache:
+
+    def test_password_change_logs_out_other_sessions(self, user, user_client):
+        assert user_client.get(reverse('posts:post_create')).status_code == 200
+        user.set_password('другой-пароль-123')
+        user.save()
+        response = user_client.get(reverse('posts:post_create'))
+        assert response.status_code == 302, (
+            'Проверьте, что смена пароля сбрасывает пользователя в кеше'
+        )
+
+    def test_profile_change_is_visible(self, user, user_client):
+        user_client.get(reverse('posts:post_create'))
+        user.username = 'Переименован'
+        user.save()
+        html = user_client.get(reverse('posts:post_create')).content.decode()
+        assert 'Переименован' in html
+
+    def test_copies_do_not_share_related_objects(self, user):
+        AuthorStats.objects.get_or_create(author=user)
+        backend = CachedModelBackend()
+        first = backend.get_user(user.pk)
+        first.stats
+        second = backend.get_user(user.pk)
+        assert first._state is not second._state
+        assert 'stats' not in second._state.fields_cache, (
+            'Проверьте, что связанные объекты одного запроса не видны другим'
+        )
+
+
+class TestTTLCache:
+
+    def test_lru_and_ttl(self):
+        now = [0.0]
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None, 'Вытесняется давно не использованная запись'
+        assert cache.get('a') == 1
+        now[0] = 10
+        assert cache.get('a') is None, 'Запись живёт не дольше ttl'
+        assert len(cache) == 1
@@ -0,0 +1,94 @@
+import threading
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from posts import page_cache, warming
+from posts.models import Group, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_concurrent_misses_render_once(settings):
+    settings.PAGE_CACHE_POLL_INTERVAL = 0.005
+    rendered = []
+    started = threading.Event()
+    release = threading.Event()
+
+    @page_cache.cache_shared_page
+    def view(request):
+        page_cache.depend_on(request, 'test')
+        rendered.append(1)
+        started.set()
+        release.wait(5)
+        return HttpResponse('страница')
+
+    factory = RequestFactory()
+    responses = []
+
+    def get():
+        request = factory.get('/single-flight/')
+        request.user = type('Anonymous', (), {'is_authenticated': False})()
+        responses.append(view(request))
+
+    first = threading.Thread(target=get)
+    first.start()
+    started.wait(5)
+    others = [threading.Thread(target=get) for _ in range(3)]
+    for thread in others:
+        thread.start()
+    release.set()
+    for thread in [first, *others]:
+        thread.join()
+    assert len(rendered) == 1, (
+        'Проверьте, что одновременные промахи по одной странице '
+        'отрисовывает один запрос'
+    )
+    assert [response.content.decode() for response in responses] == ['страница'] * 4
+
+
+def test_access_counts_pick_hot_feeds(client, mixer, user):
+    quiet, busy = mixer.cycle(2).blend(Group)
+    mixer.cycle(5).blend(Post, author=user, group=quiet)
+    mixer.cycle(1).blend(Post, author=user, group=busy)
+    assert warming.hot_groups(1) == [quiet], (
+        'Без счёта обращений прогреваются самые большие группы'
+    )
+    for _ in range(3):
+        client.get(f'/group/{busy.slug}/')
+    page_cache.flush_access(force=True)
+    assert warming.hot_groups(2) == [busy, quiet], (
+        'Проверьте, что горячие группы выбираются по счёту обращений'
+    )
+
+
+def test_page_paths(settings, mixer, user):
+    settings.CONST = 2
+    mixer.cycle(5).blend(Post, author=user)
+    assert warming.page_paths('/', Post.objects.all(), 5) == [
+        '/', '/?page=2', '/?page=3'
+    ]
+    settings.PAGINATION_MODE = 'cursor'
+    paths = warming.page_paths('/', Post.objects.all(), 2)
+    assert len(paths) == 2 and paths[1].startswith('/?after=')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_warm_caches_fills_page_cache(settings, mixer, user, group):
+    settings.ALLOWED_HOSTS = ['yatube.example']
+    mixer.cycle(12).blend(Post, author=user, group=group)
+    out = StringIO()
+    err = StringIO()
+    call_command('warm_caches', '--pages', '2', '--workers', '2', stdout=out, stderr=err)
+    assert 'Прогрето страниц: 6' in out.getvalue(), out.getvalue()
+    assert 'LocMemCache' in err.getvalue(), (
+        'Проверьте, что команда предупреждает о кеше в памяти процесса'
+    )
+    hits = page_cache.stats.hits
+    client = Client(HTTP_HOST='yatube.example')
+    assert client.get(f'/group/{group.slug}/?page=2').status_code == 200
+    assert page_cache.stats.hits == hits + 1, (
+        'Проверьте, что после warm_caches страницы отдаются из кеша'
+    )
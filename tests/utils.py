@@ -1,4 +1,8 @@
+from contextlib import contextmanager
+
+from django.db import connection
 from django.template.context import RequestContext
+from django.test.utils import CaptureQueriesContext
 
 
 def get_field_from_context(context, field_type):
@@ -8,3 +12,16 @@ def get_field_from_context(context, field_type):
         if field not in ('user', 'request') and isinstance(context[field], field_type):
             return context[field]
     return
+
+
+@contextmanager
+def assert_max_queries(limit, label=''):
+    """Падает, если внутри блока выполнено больше `limit` SQL-запросов."""
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    executed = len(context.captured_queries)
+    sql = '\n'.join(query['sql'] for query in context.captured_queries)
+    assert executed <= limit, (
+        f'Страница `{label}` выполнила {executed} SQL-запросов '
+        f'при бюджете {limit}:\n{sql}'
+    )
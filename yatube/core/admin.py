@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'key')
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created')
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,184 @@
+"""Замер маршрутов сайта в процессе, через тестовый клиент Django.
+
+Для каждого маршрута запоминаются задержки запросов, число SQL-запросов
+и размер ответа; результаты можно сравнить с сохранённым эталоном.
+
+Замер ничего не создаёт в базе и не трогает кеш сайта: страницы
+открываются от имени автора последнего поста, сессия хранится в cookie,
+а кеш default подменяется копией со своим KEY_PREFIX (isolated_cache).
+"""
+import copy
+import math
+import time
+import uuid
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.contrib.auth.models import update_last_login
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import AuthorStats, Group, Post
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу; values должны быть отсортированы."""
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def isolated_cache():
+    """Подменяет кеш default копией его настройки со своим KEY_PREFIX.
+
+    Замер кладёт в кеш страницы и версии лент и сбрасывает их; в общем
+    кеше сайта это испортило бы записи с теми же ключами, а clear() у
+    memcached или Redis стёр бы кеш целиком. У LocMemCache вдобавок своё
+    хранилище.
+    """
+    caches = copy.deepcopy(settings.CACHES)
+    namespace = f'bench-{uuid.uuid4().hex}'
+    default = caches[DEFAULT_CACHE_ALIAS]
+    default['KEY_PREFIX'] = namespace
+    if default['BACKEND'].endswith('.LocMemCache'):
+        default['LOCATION'] = namespace
+    return override_settings(CACHES=caches)
+
+
+def bench_user():
+    """Автор последнего поста и сам пост, или (None, None) без постов.
+
+    От имени автора открываются страницы с логином, и post_edit отвечает
+    формой, а не перенаправлением.
+    """
+    post = Post.objects.select_related('author').order_by('-pk').first()
+    if post is None:
+        return None, None
+    return post.author, post
+
+
+def routes():
+    """(имя маршрута, путь, нужен ли вход) для всех страниц сайта.
+
+    Для лент группы и профиля берутся самые большие: на них страница
+    дороже всего.
+    """
+    user, post = bench_user()
+    group = Group.objects.order_by('-posts_count').first()
+    stats = AuthorStats.objects.select_related('author').order_by(
+        '-posts_count'
+    ).first()
+    author = stats.author if stats else user
+    group_routes = [
+        ('posts:group_list',
+         reverse('posts:group_list', args=[group.slug]), False),
+    ] if group else []
+    return [
+        ('posts:index', reverse('posts:index'), False),
+        *group_routes,
+        ('posts:profile',
+         reverse('posts:profile', args=[author.username]), False),
+        ('posts:post_detail',
+         reverse('posts:post_detail', args=[post.pk]), False),
+        ('posts:post_create', reverse('posts:post_create'), True),
+        ('posts:post_edit', reverse('posts:post_edit', args=[post.pk]), True),
+        ('users:login', reverse('users:login'), False),
+        ('users:signup', reverse('users:signup'), False),
+        ('about:author', reverse('about:author'), False),
+        ('about:tech', reverse('about:tech'), False),
+    ]
+
+
+def measure(client, path, requests, warmup=1, cold=False):
+    """Запрашивает path requests раз и сводит результаты.
+
+    cold=True даёт каждому запросу пустой кеш: так меряется отрисовка
+    страницы, а не отдача из кеша.
+    """
+    for _ in range(warmup):
+        client.get(path)
+    timings = []
+    queries = []
+    sizes = []
+    statuses = set()
+    for _ in range(requests):
+        fresh_cache = isolated_cache() if cold else nullcontext()
+        with fresh_cache, CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context.captured_queries))
+        sizes.append(len(response.content))
+        statuses.add(response.status_code)
+    timings.sort()
+    return {
+        'requests': requests,
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+
+
+def run(requests, warmup=1, cold=False, only=None):
+    """Замеряет маршруты; в базе должен быть хотя бы один пост."""
+    user, _ = bench_user()
+    if user is None:
+        raise ValueError('Для замера в базе нужен хотя бы один пост.')
+    hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+    results = {}
+    with isolated_cache(), override_settings(
+        ALLOWED_HOSTS=hosts,
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+    ):
+        anonymous = Client()
+        logged_in = Client()
+        # Вход замера не должен записывать last_login в базу.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        try:
+            logged_in.force_login(user)
+        finally:
+            user_logged_in.connect(
+                update_last_login, dispatch_uid='update_last_login'
+            )
+        for name, path, login in routes():
+            if only and name not in only:
+                continue
+            client = logged_in if login else anonymous
+            results[name] = {
+                'path': path,
+                **measure(client, path, requests, warmup, cold),
+            }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно эталона с тем же набором размеров.
+
+    Регрессия — p95 выше эталонного больше чем на tolerance (доля), или
+    больше SQL-запросов на запрос, чем в эталоне.
+    """
+    regressions = []
+    for size, measured in results.items():
+        for name, current in measured.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            limit = previous['p95_ms'] * (1 + tolerance)
+            if current['p95_ms'] > limit:
+                regressions.append(
+                    f'{size} {name}: p95 {current["p95_ms"]:.1f} мс, '
+                    f'было {previous["p95_ms"]:.1f} мс'
+                )
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f'{size} {name}: {current["queries"]} запросов, '
+                    f'было {previous["queries"]}'
+                )
+    return regressions
@@ -0,0 +1,42 @@
+import threading
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class CacheStats:
+    """Счётчики попаданий и промахов одного слоя кеша в этом процессе."""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self, count=1):
+        with self._lock:
+            self.hits += count
+
+    def miss(self, count=1):
+        with self._lock:
+            self.misses += count
+
+    @property
+    def ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'ratio': self.ratio}
+
+
+def cache_stats(name):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = CacheStats(name)
+        return _registry[name]
+
+
+def snapshot():
+    with _registry_lock:
+        return {name: stats.as_dict() for name, stats in _registry.items()}
@@ -0,0 +1,89 @@
+"""Чтение из реплик для публичных страниц, запись — только в основную базу.
+
+Представления, помеченные read_from_replica, читают из одной из баз
+DATABASE_REPLICAS; всё остальное, включая админку, авторизацию и формы,
+работает с default. Пользователь, который только что что-то записал,
+REPLICA_STICKY_SECONDS читает из основной базы: иначе реплика с
+задержкой показала бы ему страницу без его собственной правки.
+"""
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_COOKIE = 'primary_until'
+
+_state = threading.local()
+
+
+def reset(pinned=False):
+    _state.pinned = pinned
+    _state.replica = False
+    _state.wrote = False
+    _state.used_replica = False
+
+
+def pinned_until(request):
+    try:
+        return float(request.COOKIES.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def used_replica():
+    return getattr(_state, 'used_replica', False)
+
+
+def read_from_replica(view):
+    """Разрешает представлению читать из реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        previous = getattr(_state, 'replica', False)
+        _state.replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or not getattr(_state, 'replica', False)
+            or getattr(_state, 'pinned', False)
+        ):
+            return None
+        _state.used_replica = True
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # В репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def pin_primary(response):
+    """Ставит cookie, по которой следующие запросы читают из default."""
+    window = settings.REPLICA_STICKY_SECONDS
+    response.set_cookie(
+        PRIMARY_COOKIE, f'{time.time() + window:.3f}', max_age=window,
+        httponly=True, samesite='Lax',
+    )
@@ -0,0 +1,73 @@
+"""Дырки в общих страницах для частей, зависящих от пользователя.
+
+Шаблон оставляет на месте такой части маркер {% hole 'имя' арг... %},
+страница целиком кешируется одна на всех, а HolePunchMiddleware на выходе
+заменяет маркеры кусками, отрисованными для текущего пользователя.
+"""
+import hashlib
+import re
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+MARKER_PREFIX = '<!--hole:'
+HOLE_RE = re.compile(r'<!--hole:(\w+)((?::[\w-]*)*)-->')
+
+VARIANT_SESSION_KEY = 'holes_variant'
+
+_renderers = {}
+
+
+def register(name):
+    def decorator(func):
+        _renderers[name] = func
+        return func
+    return decorator
+
+
+def marker(name, *args):
+    if name not in _renderers:
+        raise ValueError(f'Неизвестная дырка: {name}')
+    encoded = ''.join(f':{arg}' for arg in args)
+    if not HOLE_RE.fullmatch(f'{MARKER_PREFIX}{name}{encoded}-->'):
+        raise ValueError(f'Недопустимые аргументы дырки {name}: {args}')
+    return mark_safe(f'{MARKER_PREFIX}{name}{encoded}-->')
+
+
+def fill(request, content):
+    def render(match):
+        args = match.group(2).split(':')[1:]
+        return _renderers[match.group(1)](request, *args)
+    return HOLE_RE.sub(render, content)
+
+
+def variant(request):
+    """Строка, от которой зависит содержимое всех дырок для запроса.
+
+    В неё входит хеш ключа сессии: после нового входа в дырках другой
+    csrf-токен, и ETag прошлой сессии не должен совпасть, хотя счётчик
+    changed() в новой сессии снова начинается с нуля.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return 'anon'
+    session = request.session
+    digest = hashlib.sha1(
+        (session.session_key or '').encode()
+    ).hexdigest()[:10]
+    return f'u{user.pk}-{digest}-{session.get(VARIANT_SESSION_KEY, 0)}'
+
+
+def changed(request):
+    """Отмечает, что дырки пользователя теперь отрисуются иначе.
+
+    Меняет variant(), и браузер не получит 304 на страницу со старыми
+    дырками.
+    """
+    session = request.session
+    session[VARIANT_SESSION_KEY] = session.get(VARIANT_SESSION_KEY, 0) + 1
+
+
+@register('header_auth')
+def header_auth(request):
+    return render_to_string('includes/header_auth.html', request=request)
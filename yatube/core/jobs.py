@@ -0,0 +1,179 @@
+"""Очередь отложенных заданий в базе, без внешнего брокера.
+
+Представление ставит задание через enqueue() в своей транзакции: если
+транзакция откатится, задания не будет. Выполняет задания команда
+run_workers. Задания с одним именем воркер берёт пачкой, и обработчик
+с batched=True получает сразу список их данных. Упавшее задание
+повторяется через JOBS_RETRY_DELAY * 2 ** (попытка - 1) секунд, после
+JOBS_MAX_ATTEMPTS попыток остаётся в таблице со статусом failed. Задание,
+брошенное упавшим воркером, тоже считается попыткой.
+
+С JOBS_EAGER задания выполняются сразу после коммита в том же процессе:
+для тестов и разработки без воркеров.
+"""
+import json
+import logging
+import os
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from . import metrics
+from .models import Job
+
+logger = logging.getLogger('yatube.jobs')
+
+jobs_total = metrics.registry.counter(
+    'yatube_jobs_total', 'Выполненные задания.', ('name', 'outcome')
+)
+
+_tasks = {}
+
+
+class Task:
+    def __init__(self, name, func, batched):
+        self.name = name
+        self.func = func
+        self.batched = batched
+
+    def run(self, payloads):
+        if self.batched:
+            self.func(payloads)
+            return
+        for payload in payloads:
+            self.func(**payload)
+
+
+def task(name, batched=False):
+    """Регистрирует обработчик заданий name.
+
+    Обработчик вызывается как func(**payload), а с batched=True — как
+    func([payload, ...]). Он должен быть идемпотентным: после падения
+    воркера задание выполнится ещё раз.
+    """
+    def decorator(func):
+        _tasks[name] = Task(name, func, batched)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """Ставит задание; ждущее задание с тем же key не дублируется."""
+    if name not in _tasks:
+        raise ValueError(f'Неизвестное задание: {name}')
+    payload = payload or {}
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: _tasks[name].run([payload]))
+        return
+    Job.objects.bulk_create(
+        [Job(
+            name=name,
+            payload=json.dumps(payload),
+            key=key,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def claim(worker, batch_size):
+    """Берёт до batch_size готовых заданий с одним именем.
+
+    Задания, которые воркер держит дольше JOBS_LOCK_TIMEOUT, считаются
+    брошенными упавшим воркером и берутся заново; это засчитывается как
+    попытка, и задание, исчерпавшее попытки, помечается failed.
+    """
+    now = timezone.now()
+    stale = Q(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    )
+    ready = Job.objects.filter(
+        Q(status=Job.PENDING, run_at__lte=now) | stale
+    )
+    with transaction.atomic():
+        Job.objects.filter(
+            stale, attempts__gte=settings.JOBS_MAX_ATTEMPTS - 1
+        ).update(
+            status=Job.FAILED, attempts=F('attempts') + 1, locked_by='',
+            last_error='Воркер не завершил задание за JOBS_LOCK_TIMEOUT',
+        )
+        first = ready.order_by('run_at', 'pk').values_list(
+            'name', flat=True
+        ).first()
+        if first is None:
+            return []
+        ids = list(
+            ready.filter(name=first).order_by('run_at', 'pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        # Условие на статус повторяется в UPDATE: задание, которое между
+        # SELECT и UPDATE забрал другой воркер, сюда не попадёт.
+        ready.filter(pk__in=ids).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now,
+            attempts=Case(
+                When(status=Job.RUNNING, then=F('attempts') + 1),
+                default=F('attempts'),
+            ),
+        )
+    return list(Job.objects.filter(
+        pk__in=ids, status=Job.RUNNING, locked_by=worker, locked_at=now
+    ).order_by('run_at', 'pk'))
+
+
+def finish(jobs, error=None):
+    ids = [job.pk for job in jobs]
+    if error is None:
+        Job.objects.filter(pk__in=ids).delete()
+        return
+    for job in jobs:
+        attempts = job.attempts + 1
+        changes = {'attempts': attempts, 'last_error': error, 'locked_by': ''}
+        if attempts >= settings.JOBS_MAX_ATTEMPTS:
+            changes['status'] = Job.FAILED
+        else:
+            changes['status'] = Job.PENDING
+            changes['run_at'] = timezone.now() + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+            )
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk).update(**changes)
+        except IntegrityError:
+            # Пока задание выполнялось, поставили новое с тем же key: оно
+            # сделает ту же работу, а повтор упавшего уже не нужен.
+            Job.objects.filter(pk=job.pk).delete()
+
+
+def run_batch(worker, batch_size):
+    """Выполняет одну пачку заданий; возвращает их число."""
+    jobs = claim(worker, batch_size)
+    if not jobs:
+        return 0
+    name = jobs[0].name
+    try:
+        handler = _tasks.get(name)
+        if handler is None:
+            raise LookupError(f'Нет обработчика задания {name}')
+        handler.run([json.loads(job.payload) for job in jobs])
+    except Exception:
+        logger.exception('Задание %s упало', name)
+        finish(jobs, traceback.format_exc())
+        jobs_total.inc(len(jobs), name=name, outcome='error')
+    else:
+        finish(jobs)
+        jobs_total.inc(len(jobs), name=name, outcome='done')
+    metrics.registry.flush()
+    return len(jobs)
+
+
+def worker_name():
+    return (
+        f'{os.getpid()}-{threading.get_ident()}-{uuid.uuid4().hex[:8]}'
+    )[:64]
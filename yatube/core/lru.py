@@ -0,0 +1,65 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def detached(obj):
+    """Копия экземпляра модели без загруженных связанных объектов.
+
+    В Django 2.2 copy.copy() оставляет копии общий _state, а с ним и кеш
+    связанных объектов: без этого связанные объекты, загруженные одним
+    запросом, увидели бы все следующие, в том числе из других потоков.
+    """
+    obj = copy.copy(obj)
+    obj._state = copy.copy(obj._state)
+    obj._state.fields_cache = {}
+    return obj
+
+
+class TTLCache:
+    """LRU-кеш в памяти процесса, записи которого живут не дольше ttl.
+
+    Потокобезопасен. Подходит для небольших горячих наборов объектов,
+    которые дешевле держать в процессе, чем каждый раз читать из кеша
+    или базы; согласованность между процессами даёт только ttl.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires = item
+            if expires <= self.clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self.clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,120 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core import benchmark
+from posts import search
+from posts.models import Post
+from posts.seeding import Seeder
+
+
+def sizes_list(value):
+    return [int(size) for size in value.split(',') if size]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет все маршруты сайта тестовым клиентом: p50/p95/p99, '
+        'число SQL-запросов и размер ответа. С --sizes замер идёт на '
+        'временной базе, заполненной seed_yatube до каждого размера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--sizes', type=sizes_list,
+                            help='Число постов через запятую, '
+                                 'например 1000,10000,100000.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кеш перед каждым запросом.')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Замерить только этот маршрут.')
+        parser.add_argument('--output', help='Куда записать JSON.')
+        parser.add_argument('--baseline', help='JSON прошлого замера.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимый рост p95, доля.')
+
+    def handle(self, *args, **options):
+        if options['sizes']:
+            results = self.run_sizes(options)
+        else:
+            results = {'current': self.run_once(options)}
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'requests': options['requests'],
+                'cold': options['cold'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+            },
+            'results': results,
+        }
+        for size, routes in results.items():
+            self.print_table(size, routes)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                previous = json.load(baseline)['results']
+            regressions = benchmark.compare(
+                results, previous, options['tolerance']
+            )
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(line)
+                raise CommandError(f'Регрессий: {len(regressions)}')
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def run_once(self, options):
+        try:
+            return benchmark.run(
+                options['requests'], options['warmup'], options['cold'],
+                options['routes'],
+            )
+        except ValueError as error:
+            raise CommandError(f'{error} Запустите с --sizes N.')
+
+    def run_sizes(self, options):
+        sizes = sorted(options['sizes'])
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        # У постов временной базы те же pk, что у настоящих: всё, что
+        # сеялка и замер кладут в кеш, должно остаться в кеше замера.
+        try:
+            with benchmark.isolated_cache():
+                return self.seed_and_run(sizes, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed_and_run(self, sizes, options):
+        seeder = Seeder(options['seed'], prefix='bench')
+        authors = seeder.create_users(max(sizes[-1] // 100, 10))
+        groups = seeder.create_groups(50)
+        results = {}
+        for size in sizes:
+            missing = size - Post.objects.count()
+            if missing > 0:
+                with search.deferred_index(throwaway=True):
+                    seeder.create_posts(missing, authors, groups)
+            self.stdout.write(f'{size} постов')
+            results[str(size)] = self.run_once(options)
+        return results
+
+    def print_table(self, size, routes):
+        self.stdout.write(f'\n{size}')
+        self.stdout.write(
+            f'{"маршрут":<20}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"SQL":>6}{"байт":>9}'
+        )
+        for name, result in routes.items():
+            self.stdout.write(
+                f'{name:<20}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["queries"]:>6}'
+                f'{result["bytes"]:>9}'
+            )
@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import override_settings
+
+from core.benchmark import isolated_cache, percentile
+from posts import search
+from posts.models import Post
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность читателей SQLite при активных '
+        'писателях с настройками по умолчанию и с продакшен-профилем '
+        '(SQLITE_PRODUCTION_PRAGMAS). Работает на временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Секунд на каждый замер.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite.')
+        directory = tempfile.mkdtemp(prefix='yatube-bench-')
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            directory, 'bench.sqlite3'
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # Сигналы постов временной базы сбрасывают версии лент и записи
+        # кеша по тем же pk, что у настоящих постов; дочерние процессы
+        # наследуют подменённый кеш при fork.
+        try:
+            with isolated_cache():
+                self.run_profiles(options)
+        finally:
+            connection.close()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_profiles(self, options):
+        self.seed(options['posts'])
+        profiles = (
+            ('по умолчанию', {'journal_mode': 'delete'}),
+            ('продакшен', settings.SQLITE_PRODUCTION_PRAGMAS),
+        )
+        self.stdout.write(
+            f'{"профиль":<14}{"писатели":>9}{"чтений/с":>10}'
+            f'{"p95, мс":>9}{"записей/с":>11}{"ошибок":>8}'
+        )
+        for title, pragmas in profiles:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                # Новые PRAGMA применяются к новым подключениям.
+                connection.close()
+                for writers in (0, options['writers']):
+                    result = self.run_phase(
+                        options['readers'], writers, options['duration']
+                    )
+                    self.stdout.write(
+                        f'{title:<14}{writers:>9}'
+                        f'{result["reads"]:>10.0f}'
+                        f'{result["p95_ms"]:>9.1f}'
+                        f'{result["writes"]:>11.0f}'
+                        f'{result["errors"]:>8}'
+                    )
+
+    def seed(self, total):
+        seeder = Seeder(prefix='bench')
+        self.authors = seeder.create_users(200)
+        self.groups = seeder.create_groups(20)
+        with search.deferred_index(throwaway=True):
+            seeder.create_posts(total, self.authors, self.groups)
+
+    def run_phase(self, readers, writers, duration):
+        """Читатели и писатели — отдельные процессы: в потоках все упёрлись
+        бы в GIL, и блокировки SQLite не были бы видны."""
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        # Подключение родителя не должно достаться дочерним процессам.
+        connection.close()
+        deadline = time.monotonic() + duration
+        processes = [
+            context.Process(
+                target=self.worker, args=(writer, deadline, results)
+            )
+            for writer in [False] * readers + [True] * writers
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        latencies = sorted(
+            latency
+            for writer, latencies, _ in collected if not writer
+            for latency in latencies
+        ) or [0.0]
+        return {
+            'reads': sum(
+                len(latencies) for writer, latencies, _ in collected
+                if not writer
+            ) / duration,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'writes': sum(
+                len(latencies) for writer, latencies, _ in collected
+                if writer
+            ) / duration,
+            'errors': sum(errors for _, _, errors in collected),
+        }
+
+    def worker(self, writer, deadline, results):
+        action = self.write if writer else self.read
+        latencies = []
+        errors = 0
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    action()
+                except OperationalError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+            results.put((writer, latencies, errors))
+
+    def read(self):
+        feed = random.choice((
+            Post.objects.select_related('author', 'group'),
+            Post.objects.filter(group_id=random.choice(self.groups)),
+            Post.objects.filter(author_id=random.choice(self.authors)),
+        ))
+        offset = random.randrange(50) * settings.CONST
+        list(feed[offset:offset + settings.CONST])
+
+    def write(self):
+        Post.objects.create(
+            text='Пост из замера конкурентности',
+            author_id=random.choice(self.authors),
+            group_id=random.choice(self.groups),
+        )
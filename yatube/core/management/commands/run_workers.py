@@ -0,0 +1,78 @@
+import logging
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import jobs
+
+logger = logging.getLogger('yatube.jobs')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет отложенные задания из очереди в базе (см. core.jobs) '
+        'в нескольких потоках.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Сколько заданий с одним именем брать '
+                                 'за раз.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задания и выйти.')
+
+    def work(self, stop, done, options):
+        worker = jobs.worker_name()
+        count = 0
+        try:
+            while not stop.is_set():
+                processed = self.run_batch(worker, options['batch_size'])
+                count += processed or 0
+                if processed:
+                    continue
+                if options['once'] and processed == 0:
+                    break
+                stop.wait(options['poll_interval'])
+        finally:
+            done.append(count)
+            connection.close()
+
+    def run_batch(self, worker, batch_size):
+        """Число выполненных заданий или None при сбое самой очереди."""
+        try:
+            return jobs.run_batch(worker, batch_size)
+        except Exception:
+            # Ошибка самой очереди, например базы: задания вернутся по
+            # JOBS_LOCK_TIMEOUT, а поток продолжает работу.
+            logger.exception('Воркер %s: сбой очереди', worker)
+            connection.close()
+            return None
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        done = []
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        threads = [
+            threading.Thread(
+                target=self.work, args=(stop, done, options),
+                name=f'jobs-{i}',
+            )
+            for i in range(max(options['workers'], 1))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(f'Выполнено заданий: {sum(done)}')
@@ -0,0 +1,341 @@
+"""Реестр метрик в формате Prometheus.
+
+Счётчики и гистограммы живут в памяти процесса. Если задан
+METRICS_MULTIPROC_DIR, каждый процесс WSGI-сервера периодически сбрасывает
+свои значения в файл <pid>.json в этом каталоге, а /core/metrics/ складывает
+файлы всех процессов: так счётчики не зависят от того, какой процесс
+ответил на запрос Prometheus. Файлы завершившихся процессов процесс
+при первом сбросе переносит в архив archive.state: счётчики и гистограммы
+из него тоже складываются, поэтому суммы не уменьшаются после перезапуска
+воркера и Prometheus не видит ложного сброса счётчика.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from . import cache_stats
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Метод приходит от клиента; остальные методы идут под меткой 'other',
+# чтобы число рядов не росло от произвольных строк.
+HTTP_METHODS = frozenset((
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS',
+))
+ARCHIVE = 'archive.state'
+ARCHIVE_LOCK = 'archive.lock'
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def state(self):
+        with self._lock:
+            values = [[list(key), value] for key, value in
+                      self._values.items()]
+        return {
+            'type': self.type,
+            'help': self.documentation,
+            'labels': list(self.labelnames),
+            'values': values,
+        }
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    """Значение — счётчики по корзинам, затем сумма и число наблюдений."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def state(self):
+        return {**super().state(), 'buckets': list(self.buckets)}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), **kwargs):
+        return self._get(Histogram, name, documentation, labelnames,
+                         **kwargs)
+
+    def add_collector(self, collector):
+        """collector() возвращает {имя: состояние} для значений, которые
+        хранятся не в реестре, а считаются при сборе."""
+        self._collectors.append(collector)
+
+    def state(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        state = {metric.name: metric.state() for metric in metrics}
+        for collector in self._collectors:
+            state.update(collector())
+        return state
+
+    def flush(self, force=False):
+        """Сбрасывает значения процесса в файл в многопроцессном режиме."""
+        directory = settings.METRICS_MULTIPROC_DIR
+        now = time.monotonic()
+        if not directory or (
+            not force
+            and now - self._flushed < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        if not self._flushed:
+            prune_dead(directory)
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as output:
+            json.dump(self.state(), output)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Состояние всех процессов, если включён многопроцессный режим."""
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory:
+            return self.state()
+        self.flush(force=True)
+        states = {}
+        for entry in sorted(os.listdir(directory)):
+            pid, extension = os.path.splitext(entry)
+            if extension != '.json' or not pid.isdigit():
+                continue
+            state = _load(os.path.join(directory, entry))
+            if state is not None:
+                states[pid] = state
+        # Архив читается после файлов: файл, который уже перенесён в архив,
+        # но ещё не удалён, не должен сложиться дважды.
+        archive = read_archive(directory)
+        for pid in archive['pids']:
+            states.pop(pid, None)
+        return merge([archive['state'], *states.values()])
+
+
+def _load(path):
+    try:
+        with open(path) as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def read_archive(directory):
+    """{'pids': [...], 'state': {...}}: сумма завершившихся процессов и
+    pid, перенесённые последним prune_dead()."""
+    return _load(os.path.join(directory, ARCHIVE)) or {
+        'pids': [], 'state': {},
+    }
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def prune_dead(directory):
+    """Переносит в архив счётчики и гистограммы процессов, которых больше
+    нет, и удаляет их файлы <pid>.json; датчики (gauge) отбрасываются.
+
+    Архив правится под блокировкой файла archive.lock, а файл, pid
+    которого уже записан в архив, второй раз не складывается.
+    """
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    with open(os.path.join(directory, ARCHIVE_LOCK), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = read_archive(directory)
+        dead = {}
+        for entry in entries:
+            pid, extension = os.path.splitext(entry)
+            if extension != '.json' or not pid.isdigit() or _alive(int(pid)):
+                continue
+            path = os.path.join(directory, entry)
+            if not os.path.exists(path):
+                continue
+            dead[pid] = {} if pid in archive['pids'] else _load(path) or {}
+        if not dead and not archive['pids']:
+            return
+        archived = {
+            'pids': sorted(dead),
+            'state': merge([archive['state'], *(
+                {
+                    name: metric for name, metric in state.items()
+                    if metric['type'] != 'gauge'
+                }
+                for state in dead.values()
+            )]),
+        }
+        path = os.path.join(directory, ARCHIVE)
+        with open(f'{path}.tmp', 'w') as output:
+            json.dump(archived, output)
+        os.replace(f'{path}.tmp', path)
+        for pid in dead:
+            try:
+                os.remove(os.path.join(directory, f'{pid}.json'))
+            except FileNotFoundError:
+                pass
+
+
+def method_label(method):
+    return method if method in HTTP_METHODS else 'other'
+
+
+def merge(states):
+    """Складывает состояния процессов поэлементно по наборам меток."""
+    merged = {}
+    for state in states:
+        for name, metric in state.items():
+            target = merged.setdefault(name, {**metric, 'values': {}})
+            for labels, value in metric['values']:
+                key = tuple(labels)
+                if key not in target['values']:
+                    target['values'][key] = value
+                elif isinstance(value, list):
+                    target['values'][key] = [
+                        a + b for a, b in zip(target['values'][key], value)
+                    ]
+                else:
+                    target['values'][key] += value
+    for metric in merged.values():
+        metric['values'] = [
+            [list(key), value] for key, value in metric['values'].items()
+        ]
+    return merged
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'),
+        )
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(state):
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    lines = []
+    for name in sorted(state):
+        metric = state[name]
+        lines.append(f'# HELP {name} {metric["help"]}')
+        lines.append(f'# TYPE {name} {metric["type"]}')
+        for labels, value in sorted(metric['values']):
+            if metric['type'] != 'histogram':
+                lines.append(
+                    f'{name}{_labels(metric["labels"], labels)} '
+                    f'{_number(value)}'
+                )
+                continue
+            for bound, count in zip(
+                [*metric['buckets'], '+Inf'], [*value[:-2], value[-1]]
+            ):
+                le = bound if bound == '+Inf' else _number(float(bound))
+                bucket_labels = _labels(
+                    metric['labels'], labels, [('le', le)]
+                )
+                lines.append(f'{name}_bucket{bucket_labels} {count}')
+            plain = _labels(metric['labels'], labels)
+            lines.append(f'{name}_sum{plain} {_number(float(value[-2]))}')
+            lines.append(f'{name}_count{plain} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _cache_layers():
+    snapshot = cache_stats.snapshot()
+    layers = sorted(snapshot)
+    return {
+        f'yatube_cache_{kind}_total': {
+            'type': 'counter',
+            'help': f'Обращения к слою кеша: {kind}.',
+            'labels': ['cache'],
+            'values': [[[layer], snapshot[layer][kind]] for layer in layers],
+        }
+        for kind in ('hits', 'misses')
+    }
+
+
+registry = Registry()
+registry.add_collector(_cache_layers)
+atexit.register(lambda: registry.flush(force=True))
+
+requests_total = registry.counter(
+    'yatube_requests_total', 'HTTP-запросы.', ('route', 'method', 'status')
+)
+request_duration = registry.histogram(
+    'yatube_request_duration_seconds', 'Время ответа на запрос.', ('route',)
+)
+db_queries_total = registry.counter(
+    'yatube_db_queries_total', 'SQL-запросы, сделанные запросами.', ('route',)
+)
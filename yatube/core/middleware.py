@@ -0,0 +1,147 @@
+import cProfile
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import db_router, holes, metrics, profiling
+
+slow_log = logging.getLogger('yatube.slow_requests')
+
+
+class HolePunchMiddleware:
+    """Заполняет дырки в HTML-ответах кусками для текущего пользователя.
+
+    Статус ответа не важен: страницы ошибок и формы с ошибками тоже
+    собраны из шаблонов с дырками.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or 'text/html' not in response.get('Content-Type', '')
+        ):
+            return response
+        content = response.content.decode(response.charset)
+        if holes.MARKER_PREFIX in content:
+            response.content = holes.fill(request, content)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+        return response
+
+
+class ReplicaMiddleware:
+    """Решает, можно ли запросу читать из реплик, и закрепляет за
+    пользователем основную базу после записи (см. core.db_router).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_router.reset(
+            pinned=db_router.pinned_until(request) > time.time()
+        )
+        try:
+            response = self.get_response(request)
+            wrote = db_router.wrote()
+        finally:
+            db_router.reset()
+        if wrote and settings.DATABASE_REPLICAS:
+            db_router.pin_primary(response)
+        return response
+
+
+class ServerTimingMiddleware:
+    """Меряет SQL, шаблоны и весь запрос и отдаёт итог в Server-Timing.
+
+    Ставится первым в MIDDLEWARE. Заголовок получают только сотрудники
+    и все при DEBUG: по таймингам посторонний узнал бы, какие страницы
+    дороги для сервера. Запросы дольше SLOW_REQUEST_MS пишутся в лог
+    yatube.slow_requests одной JSON-строкой; доля PROFILE_SAMPLE_RATE
+    запросов идёт под cProfile, и профили медленных из них сохраняются
+    в PROFILE_DIR.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+        profiler = None
+        if random.random() < settings.PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with profiling.timing(profiling.RequestTimings()) as timings:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        total = time.perf_counter() - started
+        if self.shows_timing(request):
+            response['Server-Timing'] = timings.header(total)
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            self.report_slow(request, response, timings, total, profiler)
+        return response
+
+    def shows_timing(self, request):
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def report_slow(self, request, response, timings, total, profiler):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **timings.as_dict(total),
+        }
+        if profiler is not None:
+            record['profile'] = profiling.dump_profile(
+                profiler, settings.PROFILE_DIR, request.path, total,
+                settings.PROFILE_KEEP,
+            )
+        slow_log.warning(json.dumps(record), extra={'request_timings': record})
+
+
+class MetricsMiddleware:
+    """Считает запросы, их время и SQL по имени маршрута для /core/metrics/.
+
+    Ставится сразу после ServerTimingMiddleware и берёт число SQL-запросов
+    из его замеров; без него меряет сам.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        timings = profiling.current()
+        if timings is None:
+            with profiling.timing(profiling.RequestTimings()) as timings:
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        metrics.requests_total.inc(
+            route=route, method=metrics.method_label(request.method),
+            status=response.status_code,
+        )
+        metrics.request_duration.observe(duration, route=route)
+        metrics.db_queries_total.inc(timings.queries, route=route)
+        metrics.registry.flush()
+        return response
@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Отложенная работа для run_workers.
+
+    Выполненные задания удаляются; в таблице остаются ждущие, взятые
+    воркерами и упавшие после всех попыток.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'ждёт'),
+        (RUNNING, 'выполняется'),
+        (FAILED, 'не выполнено'),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.TextField(default='{}')
+    key = models.CharField(max_length=200, blank=True, null=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Ключ идемпотентности уникален только среди ждущих заданий:
+        # повторная постановка той же работы, пока она не взята, ничего
+        # не добавляет.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='pending'),
+                name='job_pending_key_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='job_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
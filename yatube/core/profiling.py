@@ -0,0 +1,123 @@
+"""Лёгкое профилирование запросов, пригодное для продакшена.
+
+На время запроса в поток кладётся RequestTimings: обёртка выполнения
+SQL на всех подключениях считает запросы и их время, шаблонный бэкенд
+TimedDjangoTemplates — время отрисовки шаблонов. Итог уходит в заголовок
+Server-Timing (см. ServerTimingMiddleware).
+"""
+import os
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+_local = threading.local()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def template_timer(self):
+        # Шаблон, отрисованный внутри другого, уже учтён снаружи.
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template += time.perf_counter() - started
+
+    def header(self, total):
+        return ', '.join((
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+    def as_dict(self, total):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db * 1000, 1),
+            'template_ms': round(self.template * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+        }
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def timing(timings):
+    """Делает timings текущими для потока и считает SQL на всех базах."""
+    _local.timings = timings
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            yield timings
+    finally:
+        _local.timings = None
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current()
+        if timings is None:
+            return super().render(context, request)
+        with timings.template_timer():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, которые засекают время отрисовки для профилирования.
+
+    Вне запроса, обёрнутого ServerTimingMiddleware, ничего не меряют.
+    """
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def dump_profile(profiler, directory, path, total, keep):
+    """Сохраняет профиль медленного запроса, оставляя keep самых медленных.
+
+    Длительность в начале имени файла, поэтому самые медленные — последние
+    при сортировке по имени.
+    """
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^\w-]+', '_', path).strip('_')[:60] or 'root'
+    name = f'{int(total * 1000):08d}ms-{slug}-{time.time():.0f}.prof'
+    profiler.dump_stats(os.path.join(directory, name))
+    dumps = sorted(
+        entry for entry in os.listdir(directory) if entry.endswith('.prof')
+    )
+    for entry in dumps[:-max(keep, 1)]:
+        try:
+            os.remove(os.path.join(directory, entry))
+        except FileNotFoundError:
+            # Тот же профиль уже удалил другой процесс.
+            pass
+    return name
@@ -0,0 +1,23 @@
+"""PRAGMA для каждого нового подключения к SQLite.
+
+Значения берутся из settings.SQLITE_PRAGMAS; в продакшен-профиле это
+WAL и остальные настройки из SQLITE_PRODUCTION_PRAGMAS.
+"""
+import re
+
+from django.conf import settings
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+def apply_pragmas(connection, pragmas):
+    for name, value in pragmas.items():
+        if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f'Недопустимая PRAGMA: {name} = {value}')
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def connection_created(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite' and settings.SQLITE_PRAGMAS:
+        apply_pragmas(connection, settings.SQLITE_PRAGMAS)
@@ -0,0 +1,10 @@
+from django import template
+
+from core import holes
+
+register = template.Library()
+
+
+@register.simple_tag
+def hole(name, *args):
+    return holes.marker(name, *args)
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path('cache-stats/', views.cache_stats_view, name='cache_stats'),
+    path('metrics/', views.metrics_view, name='metrics'),
+]
@@ -0,0 +1,23 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+from . import cache_stats, metrics
+
+
+@staff_member_required
+def cache_stats_view(request):
+    return JsonResponse(cache_stats.snapshot())
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(metrics.registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,8 +1,57 @@
+import sys
+
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Q
 
+from . import deletion, search
+from .forms import group_choices
 from .models import Post, Group
 
 
+class GroupAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение группы, которое подписывает выбранное значение по
+    словарю titles, а не запросом на каждую строку списка.
+
+    Словарь строится один раз на запрос в PostAdmin и общий у копий
+    виджета во всех строках списка.
+    """
+
+    def __init__(self, *args, titles=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.titles = titles or {}
+
+    def optgroups(self, name, value, attr=None):
+        default = (None, [], 0)
+        selected = {
+            str(v) for v in value
+            if str(v) not in self.choices.field.empty_values
+        }
+        if not self.is_required:
+            default[1].append(self.create_option(name, '', '', False, 0))
+        for pk in sorted(selected):
+            title = self.titles.get(pk)
+            if title is not None:
+                default[1].append(self.create_option(
+                    name, pk, title, selected, len(default[1])
+                ))
+        return [default]
+
+
+def _upper_bound(prefix):
+    """Наименьшая строка больше всех строк, начинающихся с prefix, или
+    None, если такой нет. Строки сравниваются по кодовым точкам.
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        # Суррогаты не кодируются в UTF-8; следующая точка — U+E000.
+        code = 0xE000
+    return prefix[:-1] + chr(code)
+
+
 class PostAdmin(admin.ModelAdmin):
     list_display = (
         'pk',
@@ -12,10 +61,109 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    # select_related() без полей не идёт по nullable group.
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    autocomplete_fields = ('group',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = GroupAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+                titles={str(pk): title for pk, title in group_choices()},
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # search_fields оставлен для поля поиска в админке, но вместо
+        # LIKE '%...%' по всей таблице ищем по полнотекстовому индексу.
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=search.matching_ids(search_term)), False
+
+
+class BatchedDeleteMixin:
+    """Удаление из админки заданием очереди через posts.deletion.
+
+    Запрос только ставит задание delete_task, а ход удаления показывает
+    колонка deletion_progress. Страница подтверждения показывает только
+    число постов, а не список из миллиона строк, который Django собрал бы
+    в памяти.
+    """
+
+    posts_field = None
+    posts_deleted = False
+    delete_task = None
+
+    def delete_model(self, request, obj):
+        deletion.schedule(self.delete_task, obj.pk)
+        request.deletion_scheduled = True
+
+    def delete_queryset(self, request, queryset):
+        for pk in queryset.values_list('pk', flat=True):
+            deletion.schedule(self.delete_task, pk)
+        request.deletion_scheduled = True
+
+    def message_user(self, request, message, *args, **kwargs):
+        # Стандартное «успешно удалено» неверно: объекты удалит воркер.
+        if getattr(request, 'deletion_scheduled', False):
+            message = (
+                'Удаление поставлено в очередь, ход видно в колонке '
+                '«удаление».'
+            )
+        super().message_user(request, message, *args, **kwargs)
+
+    def deletion_progress(self, obj):
+        progress = deletion.progress(self.delete_task, obj.pk)
+        if progress is None:
+            return ''
+        done, total = progress
+        if total is None:
+            return 'в очереди'
+        return f'{done} из {total}'
+    deletion_progress.short_description = 'удаление'
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        count = Post.objects.filter(
+            **{f'{self.posts_field}__in': objs}
+        ).count()
+        model_count = {self.model._meta.verbose_name_plural: len(objs)}
+        perms_needed = set()
+        if count and self.posts_deleted:
+            model_count[Post._meta.verbose_name_plural] = count
+            if not request.user.has_perm('posts.delete_post'):
+                perms_needed.add(Post._meta.verbose_name)
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+
+class GroupAdmin(BatchedDeleteMixin, admin.ModelAdmin):
+    list_display = ('title', 'slug', 'posts_count', 'deletion_progress')
+    search_fields = ('title', 'slug')
+    ordering = ('title',)
+    posts_field = 'group'
+    delete_task = 'posts.delete_group'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по началу названия или slug диапазоном по индексу
+        # вместо LIKE '%...%' по всей таблице групп.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        prefixes = {search_term, search_term.lower(), search_term.capitalize()}
+        condition = Q()
+        for prefix in prefixes:
+            upper = _upper_bound(prefix)
+            for field in ('title', 'slug'):
+                bounds = {f'{field}__gte': prefix}
+                if upper is not None:
+                    bounds[f'{field}__lt'] = upper
+                condition |= Q(**bounds)
+        return queryset.filter(condition), False
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,121 @@
+import copy
+from collections import Counter
+from itertools import islice
+
+from django.db import connection, transaction
+
+from . import page_cache
+from .counters import change_counters, count_posts, post_writes
+from .models import Post
+from .utils import GLOBAL_FEED, author_feed, group_feed
+
+
+def _insert_fields():
+    """Поля Post для вставки; pub_date берётся из поста как есть.
+
+    Вставка вызывает pre_save полей, и auto_now_add затёр бы переданное
+    время. Поэтому вместо pub_date вставляется копия поля без
+    auto_now_add, а общее поле в Post._meta, которое видят другие потоки,
+    не меняется.
+    """
+    fields = []
+    for field in Post._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        if field.name == 'pub_date':
+            field = copy.copy(field)
+            field.auto_now_add = False
+        fields.append(field)
+    return fields
+
+
+def bulk_create_posts(posts, batch_size=1000):
+    """Вставляет посты из любого итерируемого объекта пачками.
+
+    Возвращает число вставленных постов; в памяти держится одна пачка.
+    pub_date каждого поста должен быть задан.
+    Сигналы при bulk_create не отправляются, поэтому счётчики постов
+    и версии лент обновляются здесь же, один раз на весь вызов: вставка
+    идёт в одной транзакции.
+    """
+    fields = _insert_fields()
+    batch_size = max(
+        min(batch_size, connection.ops.bulk_batch_size(fields, [])), 1
+    )
+    posts = iter(posts)
+    authors = Counter()
+    groups = Counter()
+    with transaction.atomic():
+        while True:
+            batch = list(islice(posts, batch_size))
+            if not batch:
+                break
+            # bulk_create() вставил бы pub_date через общее поле модели.
+            Post.objects._insert(batch, fields=fields)
+            batch_authors, batch_groups = count_posts(batch)
+            authors.update(batch_authors)
+            groups.update(batch_groups)
+        posts_inserted(authors, groups)
+    return sum(authors.values())
+
+
+def insert_post_rows(rows):
+    """Вставляет посты из кортежей (text, pub_date, author_id, group_id).
+
+    Путь для миллионов строк: без экземпляров Post и подготовки значений
+    полей, одним executemany. pub_date — datetime с часовым поясом.
+    """
+    meta = Post._meta
+    columns = [
+        meta.get_field(name).column
+        for name in ('text', 'pub_date', 'edited', 'author', 'group')
+    ]
+    ops = connection.ops
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        ops.quote_name(meta.db_table),
+        ', '.join(ops.quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    authors = Counter()
+    groups = Counter()
+
+    def values():
+        for text, pub_date, author_id, group_id in rows:
+            authors[author_id] += 1
+            groups[group_id] += 1
+            pub_date = ops.adapt_datetimefield_value(pub_date)
+            yield text, pub_date, pub_date, author_id, group_id
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, values())
+        posts_inserted(authors, groups)
+    return sum(authors.values())
+
+
+def posts_inserted(authors, groups):
+    """Счётчики и версии лент после вставки постов в обход сигналов."""
+    if not authors:
+        return
+    change_counters(authors, groups)
+    post_writes.inc(sum(authors.values()), operation='bulk_create')
+    _bump_feeds(authors, groups)
+
+
+def posts_deleted(authors, groups):
+    """Счётчики и версии лент после удаления постов пачкой."""
+    if not authors:
+        return
+    change_counters(
+        {author_id: -n for author_id, n in authors.items()},
+        {group_id: -n for group_id, n in groups.items()},
+    )
+    post_writes.inc(sum(authors.values()), operation='bulk_delete')
+    _bump_feeds(authors, groups)
+
+
+def _bump_feeds(authors, groups):
+    feeds = {GLOBAL_FEED}
+    feeds.update(author_feed(author_id) for author_id in authors)
+    feeds.update(group_feed(group_id) for group_id in groups if group_id)
+    transaction.on_commit(lambda: page_cache.bump_feeds(feeds))
@@ -0,0 +1,125 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from core import metrics
+
+from .models import AuthorStats, Group, Post
+from .utils import GLOBAL_FEED, adjust_feed_counts, author_feed, group_feed
+
+post_writes = metrics.registry.counter(
+    'yatube_post_writes_total', 'Записи постов.', ('operation',)
+)
+
+
+def change_counters(author_deltas, group_deltas):
+    """Сдвигает счётчики постов на переданные дельты.
+
+    Принимает словари {id: дельта}. Строку AuthorStats, которой ещё нет,
+    создаёт по фактическому числу постов автора. Закешированные числа
+    постов лент сдвигаются после коммита транзакции.
+    """
+    with transaction.atomic():
+        for author_id, delta in author_deltas.items():
+            if not delta:
+                continue
+            updated = AuthorStats.objects.filter(author_id=author_id).update(
+                posts_count=F('posts_count') + delta
+            )
+            if not updated and delta > 0:
+                _create_author_stats(author_id)
+        for group_id, delta in group_deltas.items():
+            if group_id is not None and delta:
+                Group.objects.filter(pk=group_id).update(
+                    posts_count=F('posts_count') + delta
+                )
+    feed_deltas = Counter({GLOBAL_FEED: sum(author_deltas.values())})
+    feed_deltas.update({
+        author_feed(author_id): delta
+        for author_id, delta in author_deltas.items()
+    })
+    feed_deltas.update({
+        group_feed(group_id): delta
+        for group_id, delta in group_deltas.items() if group_id is not None
+    })
+    transaction.on_commit(lambda: adjust_feed_counts(feed_deltas))
+
+
+def _create_author_stats(author_id):
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(
+                author_id=author_id,
+                posts_count=Post.objects.filter(author_id=author_id).count(),
+            )
+    except IntegrityError:
+        # Строку успел создать параллельный запрос, и он уже учёл этот пост.
+        pass
+
+
+def post_saved(post, created):
+    loaded = getattr(post, '_loaded_values', {})
+    authors = Counter()
+    groups = Counter()
+    authors[post.author_id] += 1
+    groups[post.group_id] += 1
+    if not created:
+        authors[loaded.get('author_id', post.author_id)] -= 1
+        groups[loaded.get('group_id', post.group_id)] -= 1
+    change_counters(authors, groups)
+    post_writes.inc(operation='create' if created else 'update')
+    post._loaded_values = {
+        **loaded, 'author_id': post.author_id, 'group_id': post.group_id,
+    }
+
+
+def post_removed(post):
+    change_counters({post.author_id: -1}, {post.group_id: -1})
+    post_writes.inc(operation='delete')
+
+
+def follow_changed(follow, delta):
+    """Сдвигает число подписчиков автора или группы из подписки."""
+    if follow.group_id is not None:
+        Group.objects.filter(pk=follow.group_id).update(
+            followers_count=F('followers_count') + delta
+        )
+        return
+    stats = AuthorStats.objects.filter(author_id=follow.author_id)
+    updated = stats.update(followers_count=F('followers_count') + delta)
+    if not updated and delta > 0:
+        _create_author_stats(follow.author_id)
+        stats.update(followers_count=F('followers_count') + delta)
+
+
+def change_followers(author_deltas, group_deltas):
+    """Сдвигает счётчики подписчиков на дельты {id: дельта} — одним
+    UPDATE на автора или группу, а не по одному на подписку."""
+    for author_id, delta in author_deltas.items():
+        if delta:
+            AuthorStats.objects.filter(author_id=author_id).update(
+                followers_count=F('followers_count') + delta
+            )
+    for group_id, delta in group_deltas.items():
+        if delta:
+            Group.objects.filter(pk=group_id).update(
+                followers_count=F('followers_count') + delta
+            )
+
+
+def count_posts(posts):
+    """Считает дельты для постов, вставленных в обход сигналов."""
+    authors = Counter()
+    groups = Counter()
+    for post in posts:
+        authors[post.author_id] += 1
+        groups[post.group_id] += 1
+    return authors, groups
+
+
+def total_posts_count():
+    """Оценка общего числа постов по счётчикам авторов, без COUNT(*)."""
+    return AuthorStats.objects.aggregate(
+        total=Sum('posts_count')
+    )['total'] or 0
@@ -0,0 +1,167 @@
+"""Удаление пользователей и групп с большой историей постов.
+
+Обычное delete() собирает все связанные посты и подписки в память и
+удаляет или отвязывает их одной транзакцией, которая надолго блокирует
+SQLite. Здесь посты, подписки и лента пользователя обрабатываются
+пачками, каждая — в своей короткой транзакции, а сам пользователь или
+группа удаляются последними, когда связанных записей уже нет.
+
+Админка не удаляет в запросе, а ставит задания posts.delete_user и
+posts.delete_group в очередь (см. core.jobs); ход удаления задание
+записывает в кеш, и админка показывает его в списке.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import jobs
+
+from . import page_cache, post_cache
+from .bulk import posts_deleted
+from .counters import change_counters, change_followers
+from .models import Follow, Group, Post, User
+from .signals import muted
+from .timeline import follows_key, pulled_key
+from .utils import GLOBAL_FEED, author_feed
+
+POST_FIELDS = ('pk', 'author_id', 'group_id')
+
+
+def _batches(queryset, batch_size, fields=POST_FIELDS):
+    while True:
+        rows = list(
+            queryset.order_by('pk').values_list(*fields)[:batch_size]
+        )
+        if not rows:
+            return
+        yield rows
+
+
+def _delete_follows(follows, batch_size):
+    """Удаляет подписки пачками; счётчики подписчиков сдвигаются одним
+    UPDATE на автора или группу пачки, а кеш подписок сбрасывается
+    подписчикам пачки после коммита."""
+    fields = ('pk', 'user_id', 'author_id', 'group_id')
+    for rows in _batches(follows, batch_size, fields):
+        with transaction.atomic(), muted():
+            Follow.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            authors = Counter()
+            groups = Counter()
+            for _, _, author_id, group_id in rows:
+                if group_id is not None:
+                    groups[group_id] -= 1
+                else:
+                    authors[author_id] -= 1
+            change_followers(authors, groups)
+            keys = [
+                key for _, user_id, _, _ in rows
+                for key in (follows_key(user_id), pulled_key(user_id))
+            ]
+            transaction.on_commit(lambda keys=keys: cache.delete_many(keys))
+
+
+def _delete_rows(queryset, batch_size):
+    """Удаляет записи без сигналов пачками по pk."""
+    for rows in _batches(queryset, batch_size, ('pk',)):
+        queryset.model.objects.filter(pk__in=[pk for pk, in rows]).delete()
+
+
+def delete_user(user, batch_size=500, progress=None):
+    """Удаляет посты, подписки и ленту пользователя пачками, затем его
+    самого.
+
+    progress(удалено, всего) вызывается после каждой пачки. Возвращает
+    число удалённых постов.
+    """
+    posts = Post.objects.filter(author=user)
+    total = posts.count()
+    deleted = 0
+    for rows in _batches(posts, batch_size):
+        with transaction.atomic(), muted():
+            pks = [pk for pk, _, _ in rows]
+            Post.objects.filter(pk__in=pks).delete()
+            post_cache.forget(pks)
+            posts_deleted(
+                Counter(author_id for _, author_id, _ in rows),
+                Counter(group_id for _, _, group_id in rows),
+            )
+        deleted += len(rows)
+        if progress:
+            progress(deleted, total)
+    # Иначе delete() пользователя загрузил бы все его подписки и
+    # подписчиков разом: у Follow есть сигналы, и быстрого удаления нет.
+    _delete_follows(user.follows.all(), batch_size)
+    _delete_follows(Follow.objects.filter(author=user), batch_size)
+    _delete_rows(user.timeline.all(), batch_size)
+    user.delete()
+    return deleted
+
+
+def delete_group(group, batch_size=500, progress=None):
+    """Отвязывает посты и удаляет подписки группы пачками, затем удаляет
+    группу.
+
+    Посты остаются у авторов без группы, как при on_delete=SET_NULL.
+    Возвращает число отвязанных постов.
+    """
+    posts = Post.objects.filter(group=group)
+    total = posts.count()
+    detached = 0
+    for rows in _batches(posts, batch_size):
+        with transaction.atomic():
+            pks = [pk for pk, _, _ in rows]
+            Post.objects.filter(pk__in=pks).update(group=None)
+            post_cache.forget(pks)
+            change_counters({}, {group.pk: -len(rows)})
+            # Карточки в лентах авторов показывают группу поста.
+            feeds = {GLOBAL_FEED}
+            feeds.update(author_feed(author_id) for _, author_id, _ in rows)
+            transaction.on_commit(
+                lambda feeds=feeds: page_cache.bump_feeds(feeds)
+            )
+        detached += len(rows)
+        if progress:
+            progress(detached, total)
+    _delete_follows(Follow.objects.filter(group=group), batch_size)
+    group.delete()
+    return detached
+
+
+def progress_key(name, pk):
+    return f'posts:deletion:{name}:{pk}'
+
+
+def schedule(name, pk):
+    """Ставит удаление pk заданием name; ход видно через progress()."""
+    jobs.enqueue(name, {'pk': pk}, key=f'{name}:{pk}')
+    cache.set(
+        progress_key(name, pk), (0, None), settings.DELETION_PROGRESS_TIMEOUT
+    )
+
+
+def progress(name, pk):
+    """(удалено, всего) для поставленного удаления, всего None — пока
+    задание ждёт воркера; None, если удаления нет."""
+    return cache.get(progress_key(name, pk))
+
+
+def _run(name, model, delete, pk):
+    obj = model.objects.filter(pk=pk).first()
+    key = progress_key(name, pk)
+    if obj is not None:
+        delete(obj, progress=lambda done, total: cache.set(
+            key, (done, total), settings.DELETION_PROGRESS_TIMEOUT
+        ))
+    cache.delete(key)
+
+
+@jobs.task('posts.delete_user')
+def delete_user_job(pk):
+    _run('posts.delete_user', User, delete_user, pk)
+
+
+@jobs.task('posts.delete_group')
+def delete_group_job(pk):
+    _run('posts.delete_group', Group, delete_group, pk)
@@ -1,9 +1,57 @@
 from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.forms.models import ModelChoiceIterator
+from django.utils.functional import cached_property
 
-from .models import Post
+from .models import Group, Post
+
+GROUP_CHOICES_KEY = 'posts:group-choices'
+
+
+def group_choices():
+    """Пары (id, название) всех групп из кеша; сбрасываются сигналами."""
+    choices = cache.get(GROUP_CHOICES_KEY)
+    if choices is None:
+        choices = list(
+            Group.objects.order_by('title').values_list('pk', 'title')
+        )
+        cache.set(GROUP_CHOICES_KEY, choices, settings.GROUP_CHOICES_TIMEOUT)
+    return choices
+
+
+def invalidate_group_choices():
+    cache.delete(GROUP_CHOICES_KEY)
+
+
+class CachedGroupChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора группы без запроса ко всей таблице групп."""
+
+    @cached_property
+    def group_choices(self):
+        return group_choices()
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from self.group_choices
+
+    def __len__(self):
+        return len(self.group_choices) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.group_choices)
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        group = self.fields['group']
+        # Проверка значения остаётся на ModelChoiceField: это один
+        # запрос по первичному ключу, а список вариантов берётся из кеша.
+        group.iterator = CachedGroupChoiceIterator
+        group.widget.choices = group.choices
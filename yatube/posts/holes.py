@@ -0,0 +1,33 @@
+from django.template.loader import render_to_string
+
+from core import holes
+
+from .timeline import following
+
+
+@holes.register('edit_button')
+def edit_button(request, author_id, post_id):
+    if str(request.user.pk) != author_id:
+        return ''
+    return render_to_string(
+        'posts/includes/edit_button.html', {'post_id': post_id}
+    )
+
+
+@holes.register('follow_button')
+def follow_button(request, kind, target_id):
+    # Кнопка стоит на странице профиля или группы, и её адреса — это
+    # адрес самой страницы с follow/ или unfollow/ на конце.
+    user = request.user
+    if not user.is_authenticated or (
+        kind == 'author' and str(user.pk) == target_id
+    ):
+        return ''
+    return render_to_string(
+        'posts/includes/follow_button.html',
+        {
+            'following': f'{kind}:{target_id}' in following(user),
+            'page_path': request.path,
+        },
+        request=request,
+    )
@@ -0,0 +1,65 @@
+"""Группы по slug и авторы по username из кеша процесса.
+
+Горячих ключей у group_posts и profile немного, и их дешевле держать в
+LRU процесса, чем каждый раз искать в базе. Несуществующие ключи тоже
+запоминаются, в отдельном кеше на LOOKUP_NEGATIVE_TIMEOUT секунд:
+перебор случайных адресов не доходит до базы и не вытесняет настоящие
+записи. Сигналы сбрасывают записи при сохранении и удалении; изменения
+из других процессов видны не позже, чем истечёт TTL записи.
+"""
+
+from django.conf import settings
+from django.http import Http404
+
+from core.cache_stats import cache_stats
+from core.lru import TTLCache, detached
+
+from .models import Group, User
+
+
+class Lookup:
+    def __init__(self, name, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.found = TTLCache(
+            settings.LOOKUP_CACHE_SIZE, settings.LOOKUP_CACHE_TIMEOUT
+        )
+        self.missing = TTLCache(
+            settings.LOOKUP_NEGATIVE_SIZE, settings.LOOKUP_NEGATIVE_TIMEOUT
+        )
+        self.stats = cache_stats(name)
+
+    def get_or_404(self, key):
+        """Объект по ключу; Http404, если его нет.
+
+        Связанные объекты из select_related queryset есть только у
+        объекта, прочитанного из базы: в кеше они бы устарели.
+        """
+        cached = self.found.get(key)
+        if cached is not None:
+            self.stats.hit()
+            return detached(cached)
+        if self.missing.get(key) is not None:
+            self.stats.hit()
+            raise Http404(f'Не найдено: {key}')
+        self.stats.miss()
+        obj = self.queryset.filter(**{self.field: key}).first()
+        if obj is None:
+            self.missing.set(key, True)
+            raise Http404(f'Не найдено: {key}')
+        self.found.set(key, detached(obj))
+        return obj
+
+    def forget(self, key):
+        self.found.pop(key)
+        self.missing.pop(key)
+
+    def clear(self):
+        self.found.clear()
+        self.missing.clear()
+
+
+groups = Lookup('group_lookup', Group.objects.all(), 'slug')
+authors = Lookup(
+    'author_lookup', User.objects.select_related('stats'), 'username'
+)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import deletion
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пользователя вместе с постами или группу, отвязывая '
+        'посты, пачками в коротких транзакциях.'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--user', help='username пользователя.')
+        target.add_argument('--group', help='slug группы.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f'{done} из {total}')
+
+        batch_size = max(options['batch_size'], 1)
+        if options['user']:
+            user = self.get(User, username=options['user'])
+            count = deletion.delete_user(user, batch_size, progress)
+            message = f'Пользователь удалён, постов удалено: {count}'
+        else:
+            group = self.get(Group, slug=options['group'])
+            count = deletion.delete_group(group, batch_size, progress)
+            message = f'Группа удалена, постов отвязано: {count}'
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def get(self, model, **lookup):
+        try:
+            return model.objects.get(**lookup)
+        except model.DoesNotExist:
+            raise CommandError(f'Не найдено: {lookup}')
@@ -0,0 +1,105 @@
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import search
+from posts.models import Post
+from posts.seeding import Seeder
+from posts.utils import CursorPaginator
+
+# Полный просмотр таблицы постов или сортировка во временном B-дереве —
+# признак того, что лента не попала в индекс.
+BAD_PLAN = re.compile(r'USE TEMP B-TREE|SCAN (TABLE )?posts_post(?! USING)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу тестовыми постами и выводит EXPLAIN QUERY PLAN '
+        'и время выполнения запросов каждой ленты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=0,
+                            help='Сколько постов добавить перед замером.')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Сколько раз выполнить каждый запрос.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite.')
+        if options['posts']:
+            self.seed(options['posts'], options['users'], options['groups'])
+        if not Post.objects.exists():
+            raise CommandError('В базе нет постов, запустите с --posts N.')
+
+        failed = False
+        for title, queryset in self.feeds():
+            failed |= self.explain(title, queryset, options['repeat'])
+        if failed:
+            raise CommandError(
+                'Есть ленты с полным просмотром или сортировкой.'
+            )
+
+    def seed(self, total, users, groups):
+        seeder = Seeder(prefix=f'explain{int(time.time())}')
+        started = time.monotonic()
+        with search.deferred_index():
+            seeder.create_posts(
+                total, seeder.create_users(users),
+                seeder.create_groups(groups),
+            )
+        self.stdout.write(
+            f'Добавлено {total} постов за {time.monotonic() - started:.1f} с'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def feeds(self):
+        per_page = settings.CONST
+        middle = Post.objects.count() // 2
+        group_id = (
+            Post.objects.exclude(group=None).values_list('group', flat=True)
+            .order_by('group').first()
+        )
+        author_id = Post.objects.values_list('author', flat=True).first()
+        pivot = Post.objects.all()[middle]
+
+        index = Post.objects.select_related('author', 'group')
+        group_feed = Post.objects.filter(group_id=group_id).select_related(
+            'author'
+        )
+        author_feed = Post.objects.filter(author_id=author_id).select_related(
+            'group'
+        )
+        cursor = CursorPaginator(index, per_page).cursor_queryset(
+            after=(pivot.pub_date, pivot.pk)
+        )
+        return [
+            ('index, первая страница', index[:per_page]),
+            (f'index, OFFSET {middle}', index[middle:middle + per_page]),
+            ('index, курсор из середины', cursor),
+            ('group_list', group_feed[:per_page]),
+            ('profile', author_feed[:per_page]),
+        ]
+
+    def explain(self, title, queryset, repeat):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+            started = time.perf_counter()
+            for _ in range(repeat):
+                cursor.execute(sql, params)
+                cursor.fetchall()
+        elapsed = (time.perf_counter() - started) * 1000 / repeat
+        bad = any(BAD_PLAN.search(line) for line in plan)
+        status = self.style.ERROR('FAIL') if bad else self.style.SUCCESS('OK')
+        self.stdout.write(f'{title:<30} {elapsed:8.2f} мс  {status}')
+        for line in plan:
+            self.stdout.write(f'    {line}')
+        return bad
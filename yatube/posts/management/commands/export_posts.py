@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты в JSONL или CSV в порядке (pub_date, id), '
+        'не загружая таблицу в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для выгрузки или «-».')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--progress-every', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or transfer.guess_format(path)
+        # При выгрузке в stdout отчёт о ходе идёт в stderr.
+        report = self.stderr if path == '-' else self.stdout
+        rows = transfer.export_rows(options['chunk_size'])
+        rate = transfer.Rate()
+        written = 0
+        stream = (
+            sys.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+        try:
+            for _ in transfer.write_rows(stream, rows, fmt):
+                written += 1
+                if written % options['progress_every'] == 0:
+                    report.write(
+                        f'{written} строк, {rate(written):.0f} строк/с'
+                    )
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        report.write(self.style.SUCCESS(
+            f'Выгружено {written} строк, {rate(written):.0f} строк/с'
+        ))
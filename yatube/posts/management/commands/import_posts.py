@@ -0,0 +1,67 @@
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import transfer
+from posts.bulk import bulk_create_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты из JSONL или CSV пачками. Вместе с каждой пачкой '
+        'в базе сохраняется номер строки (контрольная точка), и прерванная '
+        'загрузка при повторном запуске продолжается с неё.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint',
+                            help='Имя контрольной точки, по умолчанию — '
+                                 'абсолютный путь к файлу.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Начать с первой строки файла.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or transfer.guess_format(path)
+        checkpoint = options['checkpoint'] or os.path.abspath(path)
+        batch_size = max(options['batch_size'], 1)
+        if options['restart']:
+            transfer.reset_checkpoint(checkpoint)
+        done = transfer.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Продолжаем со строки {done + 1}')
+
+        builder = transfer.PostBuilder()
+        rate = transfer.Rate()
+        processed = created = skipped = 0
+        with open(path, encoding='utf-8', newline='') as stream:
+            rows = islice(transfer.read_rows(stream, fmt), done, None)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                posts, rejected = builder.build(batch, done + processed + 1)
+                with transaction.atomic():
+                    created += bulk_create_posts(posts, batch_size)
+                    transfer.write_checkpoint(
+                        checkpoint, done + processed + len(batch)
+                    )
+                processed += len(batch)
+                skipped += len(rejected)
+                for line, reason in rejected:
+                    self.stderr.write(f'Строка {line}: {reason}')
+                self.stdout.write(
+                    f'{done + processed} строк, '
+                    f'{rate(processed):.0f} строк/с'
+                )
+        if skipped:
+            self.stderr.write(f'Пропущено {skipped} строк')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {created} постов, {rate(processed):.0f} строк/с'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Переиндексирует посты пачками, каждая пачка — своя транзакция. '
+        'Пока идёт перестройка, поиск работает по всему индексу, а посты '
+        'можно создавать и править.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+
+        def progress(indexed, last_id, max_id):
+            self.stdout.write(f'{indexed} постов, id {last_id} из {max_id}')
+
+        indexed = search.rebuild_index(
+            max(options['batch_size'], 1), progress
+        )
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано: {indexed}'))
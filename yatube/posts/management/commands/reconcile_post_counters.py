@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts import page_cache
+from posts.models import AuthorStats, Follow, Group, Post, User
+from posts.utils import GLOBAL_FEED, author_feed, feed_count_key, group_feed
+
+
+def id_batches(queryset, batch_size):
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def actual_counts(model, field, ids):
+    return dict(
+        model.objects.filter(**{f'{field}__in': ids}).order_by()
+        .values_list(field).annotate(n=Count('id'))
+    )
+
+
+def forget_feeds(feeds):
+    """После коммита сбрасывает закешированные числа постов лент и
+    версии их страниц: на них показаны исправленные счётчики."""
+    if not feeds:
+        return
+
+    def after_commit():
+        cache.delete_many([feed_count_key(feed) for feed in feeds])
+        page_cache.bump_feeds(feeds)
+
+    transaction.on_commit(after_commit)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счётчики постов и подписчиков авторов и групп с таблицами '
+        'постов и подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        authors = sum(
+            self.reconcile_authors(ids)
+            for ids in id_batches(User.objects.all(), batch_size)
+        )
+        groups = sum(
+            self.reconcile_groups(ids)
+            for ids in id_batches(Group.objects.all(), batch_size)
+        )
+        self.stdout.write(
+            f'Исправлено счётчиков: авторов — {authors}, групп — {groups}'
+        )
+
+    @transaction.atomic
+    def reconcile_authors(self, ids):
+        posts = actual_counts(Post, 'author', ids)
+        followers = actual_counts(Follow, 'author', ids)
+        stored = {
+            author_id: counts for author_id, *counts in
+            AuthorStats.objects.filter(author_id__in=ids)
+            .values_list('author_id', 'posts_count', 'followers_count')
+        }
+        missing = []
+        feeds = set()
+        for author_id in ids:
+            actual = [posts.get(author_id, 0), followers.get(author_id, 0)]
+            if author_id not in stored:
+                if any(actual):
+                    missing.append(AuthorStats(
+                        author_id=author_id,
+                        posts_count=actual[0], followers_count=actual[1],
+                    ))
+                    feeds.add(author_feed(author_id))
+            elif stored[author_id] != actual:
+                AuthorStats.objects.filter(author_id=author_id).update(
+                    posts_count=actual[0], followers_count=actual[1]
+                )
+                feeds.add(author_feed(author_id))
+        AuthorStats.objects.bulk_create(missing)
+        if feeds:
+            # Общее число постов на главной — сумма счётчиков авторов.
+            forget_feeds(feeds | {GLOBAL_FEED})
+        return len(feeds)
+
+    @transaction.atomic
+    def reconcile_groups(self, ids):
+        posts = actual_counts(Post, 'group', ids)
+        followers = actual_counts(Follow, 'group', ids)
+        feeds = set()
+        stored = Group.objects.filter(pk__in=ids).values_list(
+            'pk', 'posts_count', 'followers_count'
+        )
+        for group_id, *counts in stored:
+            actual = [posts.get(group_id, 0), followers.get(group_id, 0)]
+            if counts != actual:
+                Group.objects.filter(pk=group_id).update(
+                    posts_count=actual[0], followers_count=actual[1]
+                )
+                feeds.add(group_feed(group_id))
+        forget_feeds(feeds)
+        return len(feeds)
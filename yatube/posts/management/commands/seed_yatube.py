@@ -0,0 +1,83 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts import search
+from posts.models import Group, User
+from posts.seeding import Seeder
+
+
+def until_date(value):
+    return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами и постами '
+        'для замеров. Один и тот же --seed даёт одни и те же данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix',
+                            help='Префикс имён и slug, по умолчанию seed<N>.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты.')
+        parser.add_argument('--until', type=until_date,
+                            help='Дата последнего поста, ГГГГ-ММ-ДД; '
+                                 'по умолчанию — сегодня.')
+        parser.add_argument('--author-skew', type=float, default=1.2,
+                            help='Показатель Ципфа для авторов.')
+        parser.add_argument('--group-skew', type=float, default=1.0,
+                            help='Показатель Ципфа для групп.')
+        parser.add_argument('--ungrouped', type=float, default=0.3,
+                            help='Доля постов без группы.')
+        parser.add_argument('--chunk-size', type=int, default=50000,
+                            help='Сколько постов вставлять в одной '
+                                 'транзакции.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix'] or f'seed{options["seed"]}'
+        if (
+            User.objects.filter(username__startswith=f'{prefix}_').exists()
+            or Group.objects.filter(slug__startswith=f'{prefix}-').exists()
+        ):
+            raise CommandError(
+                f'Данные с префиксом {prefix} уже есть, укажите --prefix.'
+            )
+        if options['users'] < 1 and options['posts']:
+            raise CommandError('Для постов нужен хотя бы один автор.')
+        seeder = Seeder(options['seed'], prefix)
+        started = time.monotonic()
+        author_ids = seeder.create_users(options['users'])
+        group_ids = seeder.create_groups(options['groups'])
+
+        def progress(created):
+            rate = created / (time.monotonic() - started)
+            self.stdout.write(f'{created} постов, {rate:.0f} постов/с')
+
+        with search.deferred_index():
+            created = seeder.create_posts(
+                options['posts'], author_ids, group_ids,
+                chunk_size=options['chunk_size'],
+                progress=progress,
+                days=options['days'],
+                until=options['until'],
+                author_skew=options['author_skew'],
+                group_skew=options['group_skew'],
+                ungrouped=options['ungrouped'],
+            )
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей — {len(author_ids)}, '
+            f'групп — {len(group_ids)}, постов — {created} '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import warming
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее отрисовывает первые страницы главной, самых посещаемых '
+        'групп и профилей, чтобы после деплоя или очистки кеша первые '
+        'читатели не шли в базу все разом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3,
+                            help='Сколько первых страниц каждой ленты.')
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--authors', type=int, default=10)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        if warming.cache_is_local():
+            self.stderr.write(
+                'Кеш LocMemCache живёт в памяти процесса: страницы, '
+                'прогретые командой, не увидят процессы сервера.'
+            )
+        started = time.perf_counter()
+        paths = warming.feed_paths(
+            max(options['pages'], 1), options['groups'], options['authors']
+        )
+        results = warming.warm(paths, options['workers'])
+        failed = [(path, status) for path, status in results if status != 200]
+        for path, status in failed:
+            self.stderr.write(f'{path}: {status}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {len(results) - len(failed)} за '
+            f'{time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+def edited_from_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(edited=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='edited',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(edited_from_pub_date, migrations.RunPython.noop),
+    ]
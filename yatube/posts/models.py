@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
 
@@ -6,17 +6,31 @@ User = get_user_model()
 
 
 class Group(models.Model):
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
 
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+
+
 class Post(models.Model):
     text = models.TextField(help_text='Текст нового поста')
     pub_date = models.DateTimeField(auto_now_add=True)
+    edited = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -32,4 +46,123 @@ class Post(models.Model):
     )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        # В SQLite id — это rowid, он неявно входит в каждый индекс,
+        # поэтому (group, pub_date) отдаёт ленту группы в порядке
+        # (pub_date, id) без сортировки во временном B-дереве.
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'], name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Нужны сигналам, чтобы заметить перенос поста в другую группу.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Счётчики обновляются в post_save, в одной транзакции с постом.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class Follow(models.Model):
+    """Подписка на автора или на группу: задано ровно одно из двух."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follows'
+    )
+    author = models.ForeignKey(
+        User,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='followers'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='followers'
+    )
+
+    class Meta:
+        # Индексы (author, user) и (group, user) обходит рассылка поста
+        # подписчикам пачками по user_id.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['author', 'user'], name='follow_author_user_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['group', 'user'], name='follow_group_user_uniq'
+            ),
+            models.CheckConstraint(
+                check=(
+                    models.Q(author__isnull=False, group__isnull=True)
+                    | models.Q(author__isnull=True, group__isnull=False)
+                ),
+                name='follow_author_xor_group',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя.
+
+    pub_date повторяет дату поста: лента читается одним проходом по
+    индексу (user, pub_date, post) без обращения к таблице постов за
+    сортировкой.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='timeline_user_post_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Сколько строк файла уже загрузила import_posts.
+
+    Хранится в базе, а не в файле рядом с загрузкой: номер строки
+    записывается в той же транзакции, что и пачка постов, и после сбоя
+    загрузка не теряет и не повторяет строки.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    rows = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.rows}'
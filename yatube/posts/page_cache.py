@@ -0,0 +1,272 @@
+import hashlib
+import math
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date
+
+from core import db_router, holes, metrics
+from core.cache_stats import cache_stats
+
+from .utils import GLOBAL_FEED, author_feed, group_feed, post_feed
+
+HITS_KEY = 'posts:page-hits'
+
+stats = cache_stats('page_cache')
+coalesced = metrics.registry.counter(
+    'yatube_page_cache_coalesced_total',
+    'Промахи кеша страниц, дождавшиеся страницы, которую отрисовал другой '
+    'запрос.',
+)
+
+_hits = Counter()
+_hits_lock = threading.Lock()
+_hits_flushed = 0.0
+
+
+def feed_version_key(feed):
+    return f'posts:feed-version:{feed}'
+
+
+def feed_modified_key(feed):
+    return f'posts:feed-modified:{feed}'
+
+
+def feed_versions(feeds):
+    """Текущие версии лент; отсутствующие в кеше версии заводятся заново.
+
+    Версия — метка, которая меняется при каждой записи в ленту и никогда
+    не уменьшается. Пропавшая из кеша версия заводится текущим временем:
+    оно больше любой прежней версии этой ленты.
+    """
+    keys = [feed_version_key(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def feeds_modified(feeds):
+    """Время последней записи в ленты для Last-Modified или None, если
+    для какой-то из них оно неизвестно: ключ пропал из кеша.
+    """
+    keys = [feed_modified_key(feed) for feed in feeds]
+    modified = cache.get_many(keys)
+    if not keys or len(modified) < len(keys):
+        return None
+    return max(modified.values())
+
+
+def bump_feeds(feeds, when=None):
+    """Меняет версии лент после записи в них; when — время записи.
+
+    Ни версия, ни время изменения не уменьшаются: правка с прежним
+    временем edited или процесс с отстающими часами не вернут ленте
+    версию, под которой уже лежит страница в кеше.
+    """
+    now = time.time()
+    when = now if when is None else when
+    pairs = [
+        (feed_version_key(feed), feed_modified_key(feed)) for feed in feeds
+    ]
+    current = cache.get_many([key for pair in pairs for key in pair])
+    values = {}
+    for version_key, modified_key in pairs:
+        values[version_key] = max(now, current.get(version_key, 0) + 0.001)
+        values[modified_key] = max(when, current.get(modified_key, 0))
+    cache.set_many(values, timeout=None)
+
+
+def post_feeds(post):
+    """Ленты, страницы которых меняются при записи поста."""
+    loaded = getattr(post, '_loaded_values', {})
+    feeds = {GLOBAL_FEED, post_feed(post.pk)}
+    for author_id in {post.author_id, loaded.get('author_id')}:
+        if author_id is not None:
+            feeds.add(author_feed(author_id))
+    for group_id in {post.group_id, loaded.get('group_id')}:
+        if group_id is not None:
+            feeds.add(group_feed(group_id))
+    return feeds
+
+
+def depend_on(request, *feeds):
+    """Отмечает, от каких лент зависит страница.
+
+    Вызывается во view до чтения постов: версии запоминаются сразу, и
+    запись, случившаяся во время отрисовки, сделает страницу устаревшей.
+    """
+    versions = getattr(request, '_page_cache_versions', {})
+    versions.update(feed_versions(feeds))
+    request._page_cache_versions = versions
+    request._page_cache_feeds = (
+        getattr(request, '_page_cache_feeds', set()) | set(feeds)
+    )
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'posts:page:{path}'
+
+
+def is_fresh(entry):
+    versions = entry['versions']
+    return cache.get_many(list(versions)) == versions
+
+
+def make_entry(request, response):
+    versions = getattr(request, '_page_cache_versions', None)
+    if not versions or response.status_code != 200 or response.cookies:
+        return None
+    modified = feeds_modified(request._page_cache_feeds)
+    # Реплика могла ещё не получить запись, сменившую версию ленты; такую
+    # страницу не кладём в общий кеш, пока не пройдёт окно задержки.
+    if db_router.used_replica() and modified is not None and (
+        modified > time.time() - settings.REPLICA_STICKY_SECONDS
+    ):
+        return None
+    content = response.content
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'etag': hashlib.md5(content).hexdigest(),
+        'last_modified': None if modified is None else math.ceil(modified),
+        'versions': versions,
+    }
+
+
+def cached_response(request, entry):
+    # Тело общее, но дырки заполняются под пользователя: ETag у каждого свой.
+    etag = f'"{entry["etag"]}-{holes.variant(request)}"'
+    response = HttpResponse(
+        entry['content'], content_type=entry['content_type']
+    )
+    response['ETag'] = etag
+    if entry['last_modified'] is not None:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_vary_headers(response, ('Cookie',))
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=entry['last_modified'],
+        response=response,
+    ) or response
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def wait_for(key):
+    """Ждёт страницу, которую отрисовывает другой запрос.
+
+    Возвращает свежую запись или None, если её не дождались за
+    PAGE_CACHE_LOCK_WAIT секунд или отрисовавший запрос её не сохранил.
+    """
+    deadline = time.monotonic() + settings.PAGE_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.PAGE_CACHE_POLL_INTERVAL)
+        if cache.get(lock_key(key)) is None:
+            entry = cache.get(key)
+            if entry is not None and is_fresh(entry):
+                return entry
+            return None
+    return None
+
+
+def render_entry(request, key, view, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    entry = make_entry(request, response)
+    if entry is None:
+        return response
+    cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+    return cached_response(request, entry)
+
+
+def record_access(path):
+    """Считает обращения к страницам для warm_caches.
+
+    Счёт копится в процессе и раз в PAGE_HITS_FLUSH_INTERVAL секунд
+    добавляется к общему словарю в кеше. Одновременный сброс из двух
+    процессов может потерять часть счёта: для выбора горячих лент
+    это не важно.
+    """
+    with _hits_lock:
+        _hits[path] += 1
+    flush_access()
+
+
+def flush_access(force=False):
+    global _hits_flushed
+    now = time.monotonic()
+    with _hits_lock:
+        if not force and (
+            now - _hits_flushed < settings.PAGE_HITS_FLUSH_INTERVAL
+        ):
+            return
+        _hits_flushed = now
+        pending = dict(_hits)
+        _hits.clear()
+    if not pending:
+        return
+    counts = Counter(cache.get(HITS_KEY) or {})
+    counts.update(pending)
+    cache.set(
+        HITS_KEY, dict(counts.most_common(settings.PAGE_HITS_KEEP)), None
+    )
+
+
+def access_counts():
+    """{путь: число обращений} по всем процессам, самые частые первыми."""
+    return cache.get(HITS_KEY) or {}
+
+
+def cache_shared_page(view):
+    """Кеширует страницу, общую для всех читателей, и отвечает 304.
+
+    Страница считается актуальной, пока не сменилась версия ни одной из
+    лент, переданных во view в depend_on(). Части страницы, зависящие от
+    пользователя, должны быть дырками из core.holes.
+
+    Одновременные промахи по одной странице отрисовывает один запрос:
+    остальные ждут его результат (single-flight), а не идут в базу.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            not settings.PAGE_CACHE_ENABLED
+            or request.method not in ('GET', 'HEAD')
+        ):
+            return view(request, *args, **kwargs)
+        record_access(request.path)
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry):
+            stats.hit()
+            return cached_response(request, entry)
+        stats.miss()
+        lock = lock_key(key)
+        if not cache.add(lock, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+            entry = wait_for(key)
+            if entry is not None:
+                coalesced.inc()
+                return cached_response(request, entry)
+            return render_entry(request, key, view, *args, **kwargs)
+        try:
+            return render_entry(request, key, view, *args, **kwargs)
+        finally:
+            cache.delete(lock)
+    return wrapper
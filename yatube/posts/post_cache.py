@@ -0,0 +1,171 @@
+"""Кеш постов по pk вместе со снимком автора и группы.
+
+В кеше лежат не объекты, а значения полей: пост целиком, у автора и
+группы — только поля, которые показывают страницы постов. Остальные
+поля автора и группы при обращении дочитываются из базы, как отложенные.
+get_many() достаёт страницу постов одним обращением к кешу.
+
+Запись сбрасывается при сохранении и удалении поста и при массовых
+операциях из posts.deletion. После правки автора или группы записи их
+постов сбрасывает задание posts.forget_posts (см. core.jobs): до него
+страницы постов показывают старые имя и название. Если
+есть реплики, пост, записанный меньше REPLICA_STICKY_SECONDS назад и
+прочитанный из реплики, в кеш не кладётся: реплика могла ещё не
+получить запись.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import Http404
+
+from core import db_router, jobs
+from core.cache_stats import cache_stats
+
+from . import page_cache
+from .models import Group, Post, User
+from .utils import GLOBAL_FEED, author_feed, group_feed
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'edited', 'author_id', 'group_id')
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+GROUP_FIELDS = ('id', 'title', 'slug')
+
+stats = cache_stats('post_objects')
+
+
+def post_key(pk):
+    return f'posts:object:{pk}'
+
+
+def written_key(pk):
+    return f'posts:object-written:{pk}'
+
+
+def _values(obj, fields):
+    return tuple(getattr(obj, field) for field in fields)
+
+
+def snapshot(post):
+    group = post.group
+    return {
+        'post': _values(post, POST_FIELDS),
+        'author': _values(post.author, AUTHOR_FIELDS),
+        'group': _values(group, GROUP_FIELDS) if group else None,
+    }
+
+
+def restore(entry):
+    post = Post.from_db(DEFAULT_DB_ALIAS, POST_FIELDS, entry['post'])
+    post.author = User.from_db(
+        DEFAULT_DB_ALIAS, AUTHOR_FIELDS, entry['author']
+    )
+    if entry['group'] is not None:
+        post.group = Group.from_db(
+            DEFAULT_DB_ALIAS, GROUP_FIELDS, entry['group']
+        )
+    return post
+
+
+def get_many(pks):
+    """{pk: пост} для найденных pk: из кеша, недостающие — одним запросом.
+
+    Прочитанные из базы посты приходят с author.stats: в кеш статистика
+    не попадает, там она бы устарела.
+    """
+    keys = {post_key(pk): pk for pk in pks}
+    written = {}
+    if settings.DATABASE_REPLICAS:
+        written = {written_key(pk): pk for pk in keys.values()}
+    found = cache.get_many([*keys, *written])
+    posts = {
+        keys[key]: restore(entry)
+        for key, entry in found.items() if key in keys
+    }
+    stats.hit(len(posts))
+    missing = [pk for pk in keys.values() if pk not in posts]
+    if not missing:
+        return posts
+    stats.miss(len(missing))
+    loaded = list(Post.objects.filter(pk__in=missing).select_related(
+        'author__stats', 'group'
+    ))
+    recent = set()
+    if db_router.used_replica():
+        recent = {pk for key, pk in written.items() if key in found}
+    entries = {}
+    for post in loaded:
+        posts[post.pk] = post
+        if post.pk not in recent:
+            entries[post_key(post.pk)] = snapshot(post)
+    cache.set_many(entries, settings.POST_OBJECT_TIMEOUT)
+    return posts
+
+
+def get_or_404(pk):
+    post = get_many([pk]).get(pk)
+    if post is None:
+        raise Http404(f'Нет поста {pk}')
+    return post
+
+
+def forget(pks):
+    """Сбрасывает записи сразу и ещё раз после коммита: иначе запрос,
+    прочитавший пост до коммита, вернул бы в кеш старую версию.
+    """
+    keys = [post_key(pk) for pk in pks]
+    if not keys:
+        return
+    cache.delete_many(keys)
+
+    def after_commit():
+        cache.delete_many(keys)
+        if settings.DATABASE_REPLICAS:
+            cache.set_many(
+                {written_key(pk): True for pk in pks},
+                settings.REPLICA_STICKY_SECONDS,
+            )
+
+    transaction.on_commit(after_commit)
+
+
+def forget_posts(posts, batch_size=1000):
+    """Сбрасывает записи всех постов queryset posts пачками."""
+    batch = []
+    for pk in posts.values_list('pk', flat=True).iterator():
+        batch.append(pk)
+        if len(batch) == batch_size:
+            forget(batch)
+            batch = []
+    forget(batch)
+
+
+def _related_feeds(posts, field, feed):
+    ids = posts.order_by().values_list(field, flat=True).distinct()
+    return {feed(pk) for pk in ids if pk is not None}
+
+
+@jobs.task('posts.forget_posts')
+def forget_source_posts(author_id=None, group_id=None):
+    """Сбрасывает записи постов автора или группы, затем версии лент, где
+    видны имя автора или название группы: страницы, отрисованные из
+    старых записей до сброса, тоже устаревают.
+    """
+    feeds = {GLOBAL_FEED}
+    if author_id is not None:
+        posts = Post.objects.filter(author_id=author_id)
+        feeds.add(author_feed(author_id))
+        feeds |= _related_feeds(posts, 'group_id', group_feed)
+    else:
+        posts = Post.objects.filter(group_id=group_id)
+        feeds.add(group_feed(group_id))
+        feeds |= _related_feeds(posts, 'author_id', author_feed)
+    forget_posts(posts)
+    page_cache.bump_feeds(feeds)
+
+
+def schedule_forget(author_id=None, group_id=None):
+    """Ставит в очередь сброс записей постов автора или группы."""
+    if author_id is not None:
+        source, key = {'author_id': author_id}, f'author:{author_id}'
+    else:
+        source, key = {'group_id': group_id}, f'group:{group_id}'
+    jobs.enqueue('posts.forget_posts', source, key=f'forget_posts:{key}')
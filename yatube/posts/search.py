@@ -0,0 +1,170 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+INSERT_TRIGGER = 'posts_post_fts_insert'
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def fts_query(query):
+    """Переводит пользовательский запрос в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки (служебный синтаксис FTS5 не работает)
+    и ищется по префиксу, чтобы находились другие окончания слова.
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def matching_ids(query):
+    """Подзапрос id постов, подходящих под запрос, для filter(pk__in=...)."""
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [fts_query(query)],
+    )
+
+
+class SearchResults:
+    """Результаты поиска в порядке релевантности (bm25) для Paginator."""
+
+    def __init__(self, query):
+        self.match = fts_query(query)
+
+    def count(self):
+        if not self.match:
+            return 0
+        if not is_available():
+            return self._fallback().count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('Результаты поиска можно только нарезать.')
+        if not self.match:
+            return []
+        if not is_available():
+            return list(self._fallback()[key])
+        start = key.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, key.stop - start, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def _fallback(self):
+        posts = Post.objects.select_related('author', 'group')
+        for word in re.findall(r'\w+', self.match):
+            posts = posts.filter(text__icontains=word)
+        return posts
+
+
+def rebuild_index(batch_size, progress=None):
+    """Переиндексирует посты пачками по id, каждая пачка — своя короткая
+    транзакция; возвращает число переиндексированных постов.
+
+    Пачка сначала удаляется из индекса командой 'delete' с текущим
+    текстом (триггеры держат индекс в согласии с таблицей), затем
+    вставляется заново. Посты вне пачки остаются в индексе, поэтому поиск
+    во время перестройки находит всё, а триггеры правки и удаления не
+    встречают постов, которых нет в индексе. Запись в базу блокируется
+    только на время одной пачки. Посты, добавленные во время перестройки,
+    в индекс кладут триггеры, поэтому пачки идут только до id, последнего
+    на момент старта.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT max(id) FROM posts_post')
+        max_id = cursor.fetchone()[0] or 0
+    last_id = 0
+    indexed = 0
+    while last_id < max_id:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT max(id), count(*) FROM (SELECT id FROM posts_post '
+                'WHERE id > %s AND id <= %s ORDER BY id LIMIT %s)',
+                [last_id, max_id, batch_size],
+            )
+            batch_last, count = cursor.fetchone()
+            if not count:
+                break
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) '
+                "SELECT 'delete', id, text FROM posts_post "
+                'WHERE id > %s AND id <= %s',
+                [last_id, batch_last],
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) SELECT id, text '
+                'FROM posts_post WHERE id > %s AND id <= %s',
+                [last_id, batch_last],
+            )
+        last_id = batch_last
+        indexed += count
+        if progress:
+            progress(indexed, last_id, max_id)
+    return indexed
+
+
+def _insert_trigger():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' "
+            'AND name = %s',
+            [INSERT_TRIGGER],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        raise LookupError(
+            f'Нет триггера {INSERT_TRIGGER}: индекс постов не обновляется, '
+            'примените миграции posts.'
+        )
+    return row[0]
+
+
+@contextmanager
+def deferred_index(throwaway=False):
+    """Откладывает индексацию новых постов до выхода из блока.
+
+    Триггер на вставку снимается, а на выходе возвращается на место, и
+    индекс перестраивается одним 'rebuild' в той же транзакции — для
+    массовой вставки это в разы быстрее построчной индексации. Пока
+    триггера нет, поиск не видит новых постов, поэтому откладывать можно
+    только в базе, которую никто не читает: во временной (throwaway=True)
+    или в пустой. В остальных базах блок ничего не меняет.
+    """
+    if not is_available():
+        yield
+        return
+    trigger = _insert_trigger()
+    if not throwaway and Post.objects.exists():
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER {INSERT_TRIGGER}')
+    try:
+        yield
+    finally:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(trigger)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
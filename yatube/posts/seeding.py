@@ -0,0 +1,109 @@
+"""Синтетические данные для замеров: пользователи, группы и посты.
+
+Распределения неравномерные, как в жизни: немногие авторы пишут большую
+часть постов, и несколько групп заметно популярнее остальных. Один и тот
+же seed даёт одни и те же данные.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.utils import timezone
+from faker import Faker
+
+from .bulk import insert_post_rows
+from .models import Group, User
+
+SENTENCE_POOL = 5000
+
+
+def zipf_cum_weights(n, exponent):
+    """Накопленные веса закона Ципфа для random.choices(cum_weights=...)."""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+class Seeder:
+    def __init__(self, seed=0, prefix='seed', locale='ru_RU'):
+        self.random = random.Random(seed)
+        self.faker = Faker(locale)
+        self.faker.seed_instance(seed)
+        self.prefix = prefix
+
+    def create_users(self, count):
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{self.prefix}_{i}',
+                    first_name=self.faker.first_name(),
+                    last_name=self.faker.last_name(),
+                    password=UNUSABLE_PASSWORD_PREFIX,
+                )
+                for i in range(count)
+            ),
+            batch_size=500,
+        )
+        return list(User.objects.filter(
+            username__startswith=f'{self.prefix}_'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_groups(self, count):
+        Group.objects.bulk_create(
+            (
+                Group(
+                    title=self.faker.catch_phrase()[:200],
+                    slug=f'{self.prefix}-{i}',
+                    description=self.faker.paragraph(),
+                )
+                for i in range(count)
+            ),
+            batch_size=500,
+        )
+        return list(Group.objects.filter(
+            slug__startswith=f'{self.prefix}-'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def posts(self, total, author_ids, group_ids, days=365, until=None,
+              author_skew=1.2, group_skew=1.0, ungrouped=0.3):
+        """Строки постов для insert_post_rows в порядке публикации,
+        равномерно за days дней до until (по умолчанию — до полуночи).
+
+        Текст собирается из заранее созданных Faker предложений: вызов
+        Faker на каждый пост сделал бы генерацию главной статьёй расходов.
+        """
+        rng = self.random
+        # Кто из авторов и какие группы окажутся «популярными», решает
+        # seed, а не порядок создания.
+        authors = rng.sample(author_ids, len(author_ids))
+        groups = rng.sample(group_ids, len(group_ids))
+        author_weights = zipf_cum_weights(len(authors), author_skew)
+        group_weights = zipf_cum_weights(len(groups), group_skew)
+        sentences = [self.faker.sentence() for _ in range(SENTENCE_POOL)]
+        if until is None:
+            until = timezone.now().replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+        start = until - timedelta(days=days)
+        step = timedelta(days=days) / max(total, 1)
+        for i in range(total):
+            group_id = None
+            if groups and rng.random() >= ungrouped:
+                group_id = rng.choices(groups, cum_weights=group_weights)[0]
+            yield (
+                ' '.join(rng.sample(sentences, rng.randint(1, 4))),
+                start + step * (i + rng.random()),
+                rng.choices(authors, cum_weights=author_weights)[0],
+                group_id,
+            )
+
+    def create_posts(self, total, author_ids, group_ids, chunk_size=50000,
+                     progress=None, **options):
+        """Вставляет посты транзакциями по chunk_size постов."""
+        posts = self.posts(total, author_ids, group_ids, **options)
+        created = 0
+        while created < total:
+            chunk = min(chunk_size, total - created)
+            created += insert_post_rows(islice(posts, chunk))
+            if progress:
+                progress(created)
+        return created
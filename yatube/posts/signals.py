@@ -0,0 +1,120 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters, lookups, page_cache, post_cache, timeline
+from .forms import invalidate_group_choices
+from .models import Follow, Group, Post, User
+from .utils import GLOBAL_FEED, author_feed, group_feed
+
+_state = threading.local()
+
+
+@contextmanager
+def muted():
+    """Отключает пересчёт счётчиков и версий лент для записей постов и
+    счётчиков подписчиков для удаления подписок.
+
+    Для массовых операций, которые сами учитывают пачку целиком (см.
+    posts.bulk.posts_deleted и posts.deletion), а не по одной записи.
+    """
+    previous = getattr(_state, 'muted', False)
+    _state.muted = True
+    try:
+        yield
+    finally:
+        _state.muted = previous
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or getattr(_state, 'muted', False):
+        return
+    feeds = page_cache.post_feeds(instance)
+    post_cache.forget([instance.pk])
+    counters.post_saved(instance, created)
+    edited = instance.edited.timestamp()
+    transaction.on_commit(lambda: page_cache.bump_feeds(feeds, edited))
+    if created:
+        timeline.schedule(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if getattr(_state, 'muted', False):
+        return
+    feeds = page_cache.post_feeds(instance)
+    post_cache.forget([instance.pk])
+    counters.post_removed(instance)
+    transaction.on_commit(lambda: page_cache.bump_feeds(feeds))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    # Название и slug группы есть в карточках на главной; профили авторов
+    # группы сбрасывает задание posts.forget_posts.
+    if not raw:
+        feeds = {GLOBAL_FEED, group_feed(instance.pk)}
+        transaction.on_commit(lambda: page_cache.bump_feeds(feeds))
+        transaction.on_commit(invalidate_group_choices)
+    # slug мог смениться, а старого slug здесь уже не узнать; группы
+    # меняются редко, поэтому кеш поиска групп сбрасывается целиком.
+    lookups.groups.clear()
+    transaction.on_commit(lookups.groups.clear)
+    # Записи постов нужны только при правке: у новой группы постов нет,
+    # а посты удалённой уже отвязаны в group_deleting.
+    if not raw and kwargs.get('created') is False:
+        post_cache.schedule_forget(group_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления группы её посты уже не найти: SET_NULL отвязывает их
+    # без сигналов, поэтому записи и профили авторов со ссылкой на группу
+    # сбрасываются здесь же. Админка удаляет группы через posts.deletion,
+    # который сначала отвязывает посты пачками, и сюда доходит группа без
+    # постов.
+    feeds = {
+        author_feed(author_id)
+        for author_id in instance.posts.order_by()
+        .values_list('author_id', flat=True).distinct()
+    }
+    post_cache.forget_posts(instance.posts.all())
+    if feeds:
+        transaction.on_commit(lambda: page_cache.bump_feeds(feeds))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    username = instance.username
+    lookups.authors.forget(username)
+    transaction.on_commit(lambda: lookups.authors.forget(username))
+    # Вход сохраняет только last_login: снимки автора в постах не меняются.
+    # Посты удалённого автора удаляются со своими сигналами.
+    if kwargs.get('created') is not False:
+        return
+    if update_fields is None or set(update_fields) & set(
+        post_cache.AUTHOR_FIELDS
+    ):
+        # Имя автора есть на главной и в профиле: их страницы не ждут
+        # задания, они читают авторов из базы.
+        feeds = {GLOBAL_FEED, author_feed(instance.pk)}
+        transaction.on_commit(lambda: page_cache.bump_feeds(feeds))
+        post_cache.schedule_forget(author_id=instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if not getattr(_state, 'muted', False):
+        counters.follow_changed(instance, -1)
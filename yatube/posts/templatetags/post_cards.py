@@ -0,0 +1,65 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache_stats import cache_stats
+
+register = template.Library()
+
+stats = cache_stats('post_cards')
+
+
+def card_key(post, fragment):
+    """Ключ карточки; меняется при любой правке поста, автора или группы."""
+    group = post.group
+    version = '|'.join(map(str, (
+        post.edited.timestamp(),
+        post.author.username,
+        post.author.get_full_name(),
+        group.slug if group else '',
+        group.title if group else '',
+    )))
+    digest = hashlib.md5(version.encode()).hexdigest()
+    return f'posts:card:{fragment}:{post.pk}:{digest}'
+
+
+class PostCardNode(template.Node):
+    def __init__(self, nodelist, post, fragment):
+        self.nodelist = nodelist
+        self.post = post
+        self.fragment = fragment
+
+    def render(self, context):
+        key = card_key(
+            self.post.resolve(context), self.fragment.resolve(context)
+        )
+        html = cache.get(key)
+        if html is not None:
+            stats.hit()
+            return html
+        stats.miss()
+        html = self.nodelist.render(context)
+        cache.set(key, html, settings.POST_CARD_TIMEOUT)
+        return html
+
+
+@register.tag
+def postcard(parser, token):
+    """{% postcard post 'index' %}...{% endpostcard %}
+
+    Кеширует отрисованную карточку поста. Содержимое блока должно зависеть
+    только от поста: от запроса и пользователя оно зависеть не может.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает пост и имя фрагмента'
+        )
+    nodelist = parser.parse(('endpostcard',))
+    parser.delete_first_token()
+    return PostCardNode(
+        nodelist, parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2])
+    )
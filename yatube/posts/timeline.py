@@ -0,0 +1,270 @@
+"""Лента подписок, собранная при записи постов.
+
+Новый пост после коммита раскладывается в TimelineEntry подписчиков его
+автора и группы пачками по FANOUT_BATCH_SIZE заданием очереди (см.
+core.jobs), а не в запросе автора. Посты авторов и групп, у которых
+FANOUT_PULL_THRESHOLD подписчиков и больше, не рассылаются: при чтении
+ленты они подмешиваются запросами по индексам (author, pub_date) и
+(group, pub_date). У подписчика без таких подписок страница /follow/ —
+один проход по индексу (user, pub_date, post).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+from core import jobs
+
+from . import post_cache
+from .models import Follow, Post, TimelineEntry
+from .utils import CursorPaginator, keyset
+
+
+def pulled_key(user_id):
+    return f'posts:timeline-pulled:{user_id}'
+
+
+def follows_key(user_id):
+    return f'posts:follows:{user_id}'
+
+
+def _forget(user_id):
+    cache.delete_many([pulled_key(user_id), follows_key(user_id)])
+
+
+def _source(author=None, group=None):
+    if (author is None) == (group is None):
+        raise ValueError('Нужен либо автор, либо группа')
+    if author is not None:
+        return {'author_id': author.pk}
+    return {'group_id': group.pk}
+
+
+def _follower_batches(source, batch_size):
+    last = 0
+    while True:
+        user_ids = list(
+            Follow.objects.filter(**source, user_id__gt=last)
+            .order_by('user_id')
+            .values_list('user_id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return
+        yield user_ids
+        last = user_ids[-1]
+
+
+def fan_out(post_id, batch_size=None):
+    """Раскладывает пост в ленты подписчиков, каждую пачку — отдельной
+    транзакцией. Возвращает число подписчиков, которым пост разослан.
+    """
+    batch_size = batch_size or settings.FANOUT_BATCH_SIZE
+    threshold = settings.FANOUT_PULL_THRESHOLD
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id', 'pub_date',
+        'author__stats__followers_count', 'group__followers_count',
+    ).first()
+    if post is None:
+        return 0
+    sources = []
+    if (post['author__stats__followers_count'] or 0) < threshold:
+        sources.append({'author_id': post['author_id']})
+    if (
+        post['group_id'] is not None
+        and post['group__followers_count'] < threshold
+    ):
+        sources.append({'group_id': post['group_id']})
+    delivered = 0
+    for source in sources:
+        for user_ids in _follower_batches(source, batch_size):
+            try:
+                with transaction.atomic():
+                    TimelineEntry.objects.bulk_create(
+                        [
+                            TimelineEntry(
+                                user_id=user_id, post_id=post_id,
+                                pub_date=post['pub_date'],
+                            )
+                            for user_id in user_ids
+                        ],
+                        ignore_conflicts=True,
+                    )
+            except IntegrityError:
+                # Пост удалили, пока шла рассылка.
+                return delivered
+            delivered += len(user_ids)
+    return delivered
+
+
+@jobs.task('posts.fan_out', batched=True)
+def fan_out_posts(payloads):
+    for post_id in sorted({payload['post_id'] for payload in payloads}):
+        fan_out(post_id)
+
+
+def schedule(post_id):
+    """Ставит рассылку поста подписчикам в очередь заданий."""
+    jobs.enqueue(
+        'posts.fan_out', {'post_id': post_id}, key=f'fan_out:{post_id}'
+    )
+
+
+def _backfill(user, source):
+    """Кладёт в ленту user последние TIMELINE_BACKFILL постов источника
+    одним INSERT ... SELECT, не вычитывая их в Python.
+    """
+    posts = (
+        Post.objects.filter(**source)
+        .order_by('-pub_date', '-id')
+        .values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    )
+    sql, params = posts.query.sql_with_params()
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(TimelineEntry._meta.db_table)} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT %s, id, pub_date FROM ({sql}) AS backfill '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            [user.pk, *params],
+        )
+
+
+def follow(user, author=None, group=None):
+    """Подписывает user на автора или группу.
+
+    В ленту сразу попадают TIMELINE_BACKFILL последних постов источника.
+    Возвращает False, если подписка уже была.
+    """
+    source = _source(author, group)
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, **source)
+            _backfill(user, source)
+            transaction.on_commit(lambda: _forget(user.pk))
+    except IntegrityError:
+        # Подписка уже есть: откатывать, кроме неё, нечего.
+        return False
+    return True
+
+
+def unfollow(user, author=None, group=None):
+    """Отписывает user и убирает из ленты посты источника, кроме тех,
+    что попали в неё по другой подписке.
+    """
+    source = _source(author, group)
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(user=user, **source).delete()
+        if not deleted:
+            return False
+        follows = Follow.objects.filter(user=user)
+        entries = TimelineEntry.objects.filter(user=user)
+        if author is not None:
+            entries = entries.filter(post__author=author).exclude(
+                post__group__in=follows.filter(
+                    group__isnull=False
+                ).values('group_id')
+            )
+        else:
+            entries = entries.filter(post__group=group).exclude(
+                post__author__in=follows.filter(
+                    author__isnull=False
+                ).values('author_id')
+            )
+        entries.delete()
+        transaction.on_commit(lambda: _forget(user.pk))
+    return True
+
+
+def following(user):
+    """Множество 'author:<id>' и 'group:<id>' подписок user, из кеша."""
+    key = follows_key(user.pk)
+    follows = cache.get(key)
+    if follows is None:
+        follows = {
+            f'author:{author_id}' if author_id is not None
+            else f'group:{group_id}'
+            for author_id, group_id in user.follows.values_list(
+                'author_id', 'group_id'
+            )
+        }
+        cache.set(key, follows, settings.TIMELINE_PULL_TIMEOUT)
+    return follows
+
+
+def pulled_sources(user):
+    """Подписки user на авторов и группы, чьи посты не рассылаются."""
+    key = pulled_key(user.pk)
+    sources = cache.get(key)
+    if sources is None:
+        threshold = settings.FANOUT_PULL_THRESHOLD
+        follows = user.follows.filter(
+            Q(author__stats__followers_count__gte=threshold)
+            | Q(group__followers_count__gte=threshold)
+        ).values_list('author_id', 'group_id')
+        sources = [
+            {'author_id': author_id} if author_id is not None
+            else {'group_id': group_id}
+            for author_id, group_id in follows
+        ]
+        cache.set(key, sources, settings.TIMELINE_PULL_TIMEOUT)
+    return sources
+
+
+class TimelinePaginator(CursorPaginator):
+    """Лента подписок: записи TimelineEntry пользователя вперемешку с
+    постами популярных авторов и групп, на которые он подписан.
+
+    Из ленты читаются только id постов, сами посты берутся из
+    posts.post_cache.
+    """
+
+    def __init__(self, user, per_page, **kwargs):
+        entries = user.timeline.order_by('-pub_date', '-post_id').values_list(
+            'post_id', 'pub_date'
+        )
+        super().__init__(entries, per_page, **kwargs)
+        self.user = user
+
+    def entry_posts(self, limit, after=None, before=None):
+        """До limit постов из записей ленты.
+
+        Пост, удалённый между чтением ленты и обращением к кешу, в
+        get_many не найдётся; вместо него дочитываются следующие записи,
+        чтобы страница не вышла короче при has_next.
+        """
+        posts = []
+        while len(posts) < limit:
+            entries = list(keyset(
+                self.object_list, limit, after=after, before=before,
+                pk='post_id',
+            ))
+            found = post_cache.get_many([post_id for post_id, _ in entries])
+            posts.extend(
+                found[post_id] for post_id, _ in entries if post_id in found
+            )
+            if len(entries) < limit:
+                break
+            post_id, pub_date = entries[-1]
+            if before is None:
+                after = (pub_date, post_id)
+            else:
+                before = (pub_date, post_id)
+        return posts[:limit]
+
+    def cursor_rows(self, after=None, before=None):
+        limit = self.per_page + 1
+        rows = self.entry_posts(limit, after=after, before=before)
+        for source in pulled_sources(self.user):
+            rows.extend(keyset(
+                Post.objects.filter(**source).select_related(
+                    'author', 'group'
+                ),
+                limit, after=after, before=before,
+            ))
+        unique = {post.pk: post for post in rows}.values()
+        return sorted(
+            unique, key=lambda post: (post.pub_date, post.pk),
+            reverse=before is None,
+        )[:limit]
@@ -0,0 +1,185 @@
+"""Потоковая выгрузка и загрузка постов в JSONL и CSV.
+
+Автор записывается по username, группа — по slug, поэтому файл можно
+загрузить в другую базу, где id пользователей и групп другие. Строки,
+которые нельзя загрузить, пропускаются с указанием номера и причины.
+"""
+import csv
+import json
+import os
+import time
+
+from django.utils.dateparse import parse_datetime
+
+from .models import Group, ImportCheckpoint, Post, User
+
+FIELDS = ('text', 'pub_date', 'author', 'group')
+FORMATS = ('jsonl', 'csv')
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else 'jsonl'
+
+
+def export_rows(chunk_size):
+    """Посты в порядке (pub_date, id); в памяти держится одна пачка."""
+    posts = Post.objects.order_by('pub_date', 'id').values_list(
+        'text', 'pub_date', 'author__username', 'group__slug'
+    )
+    for text, pub_date, author, group in posts.iterator(chunk_size):
+        yield {
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'author': author,
+            'group': group or '',
+        }
+
+
+def write_rows(stream, rows, fmt):
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield row
+        return
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False))
+        stream.write('\n')
+        yield row
+
+
+class BrokenRow:
+    """Строка файла, которую не удалось прочитать как объект."""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def read_rows(stream, fmt):
+    """Строки файла словарями; нечитаемые — BrokenRow с причиной, чтобы
+    номер строки и контрольная точка не сбивались.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield BrokenRow(f'неверный JSON: {error.msg}')
+            continue
+        if not isinstance(row, dict):
+            yield BrokenRow(f'ожидался объект, а не {type(row).__name__}')
+            continue
+        yield row
+
+
+class NameMap:
+    """Кеш name -> id, который дозапрашивает только незнакомые имена.
+
+    Для пачки строк делается не больше одного запроса; имена, которых
+    нет в базе, тоже запоминаются, чтобы не спрашивать о них снова.
+    """
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.ids = {}
+
+    def resolve(self, names):
+        missing = {name for name in names if name and name not in self.ids}
+        if missing:
+            found = dict(
+                self.queryset.filter(**{f'{self.field}__in': missing})
+                .values_list(self.field, 'pk')
+            )
+            for name in missing:
+                self.ids[name] = found.get(name)
+
+    def __getitem__(self, name):
+        return self.ids[name]
+
+
+class PostBuilder:
+    """Собирает Post из строк файла, разрешая авторов и группы пачкой."""
+
+    def __init__(self):
+        self.authors = NameMap(User.objects.all(), 'username')
+        self.groups = NameMap(Group.objects.all(), 'slug')
+
+    def build(self, rows, first_line=1):
+        """Возвращает посты и список (номер строки, причина) пропущенных.
+
+        first_line — номер первой строки пачки в файле.
+        """
+        valid = [row for row in rows if not isinstance(row, BrokenRow)]
+        self.authors.resolve(row.get('author') for row in valid)
+        self.groups.resolve(row.get('group') for row in valid)
+        posts = []
+        rejected = []
+        for line, row in enumerate(rows, first_line):
+            post, reason = self.build_one(row)
+            if post is None:
+                rejected.append((line, reason))
+            else:
+                posts.append(post)
+        return posts, rejected
+
+    def build_one(self, row):
+        if isinstance(row, BrokenRow):
+            return None, row.reason
+        author = row.get('author')
+        if not author:
+            return None, 'нет автора'
+        author_id = self.authors[author]
+        if author_id is None:
+            return None, f'неизвестный автор {author}'
+        group_slug = row.get('group')
+        group_id = self.groups[group_slug] if group_slug else None
+        if group_slug and group_id is None:
+            return None, f'неизвестная группа {group_slug}'
+        if not row.get('text'):
+            return None, 'нет текста'
+        try:
+            pub_date = parse_datetime(row.get('pub_date') or '')
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            return None, f'неверная дата {row.get("pub_date")!r}'
+        return Post(
+            text=row['text'],
+            pub_date=pub_date,
+            author_id=author_id,
+            group_id=group_id,
+        ), None
+
+
+def read_checkpoint(name):
+    checkpoint = ImportCheckpoint.objects.filter(name=name).first()
+    return checkpoint.rows if checkpoint else 0
+
+
+def write_checkpoint(name, rows):
+    """Сохраняет число загруженных строк; вызывается в транзакции пачки."""
+    ImportCheckpoint.objects.update_or_create(
+        name=name, defaults={'rows': rows}
+    )
+
+
+def reset_checkpoint(name):
+    ImportCheckpoint.objects.filter(name=name).delete()
+
+
+class Rate:
+    """Строки в секунду с момента создания."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+
+    def __call__(self, rows):
+        elapsed = time.monotonic() - self.started
+        return rows / elapsed if elapsed else 0.0
@@ -13,5 +13,20 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('search/', views.search, name='search'),
+    path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow, name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow, name='profile_unfollow'
+    ),
+    path('group/<slug:slug>/follow/', views.group_follow, name='group_follow'),
+    path(
+        'group/<slug:slug>/unfollow/',
+        views.group_unfollow, name='group_unfollow'
+    ),
 
 ]
@@ -1,9 +1,228 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.paginator import Page, Paginator
 from django.conf import settings
+from django.utils.functional import cached_property
+
+GLOBAL_FEED = 'global'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def feed_count_key(feed):
+    return f'posts:count:{feed}'
+
+
+def encode_cursor(post):
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, id) из токена или None, если токен испорчен."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class CursorPage(Page):
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+def keyset(queryset, limit, after=None, before=None, pk='pk'):
+    """limit строк queryset после/до ключа (pub_date, pk).
+
+    Строки после ключа идут от новых к старым, до ключа — от старых к
+    новым, чтобы LIMIT отрезал ближайшие к ключу.
+    """
+    if before is not None:
+        pub_date, key = before
+        return (
+            queryset.filter(pub_date__gte=pub_date)
+            .exclude(pub_date=pub_date, **{f'{pk}__lte': key})
+            .order_by('pub_date', pk)
+        )[:limit]
+    if after is not None:
+        pub_date, key = after
+        queryset = (
+            queryset.filter(pub_date__lte=pub_date)
+            .exclude(pub_date=pub_date, **{f'{pk}__gte': key})
+        )
+    return queryset.order_by('-pub_date', f'-{pk}')[:limit]
 
 
-def get_page_context(post_list, request):
-    paginator = Paginator(post_list, settings.CONST)
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (pub_date, id): без COUNT(*) и без OFFSET."""
+
+    def cursor_queryset(self, after=None, before=None):
+        """Запрос страницы после/до уже декодированного ключа."""
+        return keyset(
+            self.object_list, self.per_page + 1, after=after, before=before
+        )
+
+    def cursor_rows(self, after=None, before=None):
+        return list(self.cursor_queryset(after=after, before=before))
+
+    def cursor_page(self, after=None, before=None):
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before else None
+        rows = self.cursor_rows(after=after, before=before)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if before is not None:
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=has_more)
+        return CursorPage(
+            rows, self, has_next=has_more, has_previous=after is not None
+        )
+
+
+class FeedPage(Page):
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS.
+
+        Длина результата не зависит от числа страниц в ленте.
+        """
+        number = self.number
+        num_pages = self.paginator.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.paginator.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+    @property
+    def elided_page_range(self):
+        return list(self.get_elided_page_range())
+
+
+class FeedPaginator(Paginator):
+    def _get_page(self, *args, **kwargs):
+        return FeedPage(*args, **kwargs)
+
+
+class CachedCountPaginator(FeedPaginator):
+    """Paginator, который берёт число постов ленты из кеша.
+
+    При холодном кеше число берётся из estimate() (счётчики постов),
+    а если оценки нет — из COUNT(*), и кладётся в кеш. Сигналы постов
+    сдвигают закешированные значения через adjust_feed_counts.
+    """
+
+    def __init__(self, object_list, per_page, feed, estimate=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed = feed
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        return cached_feed_count(
+            self.feed, self.estimate or (lambda: Paginator.count.func(self))
+        )
+
+    def page(self, number):
+        # Число постов может быть оценкой, поэтому последнюю страницу
+        # не обрезаем по нему, а берём полный срез.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = self.object_list[bottom:bottom + self.per_page]
+        return self._get_page(object_list, number, self)
+
+
+def cached_feed_count(feed, estimate):
+    """Число постов ленты из кеша; при промахе — estimate() в кеш."""
+    key = feed_count_key(feed)
+    count = cache.get(key)
+    if count is None:
+        count = estimate()
+        cache.add(key, count, settings.FEED_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_feed_counts(deltas):
+    for feed, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            if delta > 0:
+                cache.incr(feed_count_key(feed), delta)
+            else:
+                cache.decr(feed_count_key(feed), -delta)
+        except ValueError:
+            # Ключа нет в кеше: его заполнит следующий запрос ленты.
+            pass
+
+
+def get_page_context(post_list, request, feed=GLOBAL_FEED, estimate=None):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if settings.PAGINATION_MODE == 'cursor' or after or before:
+        paginator = CursorPaginator(post_list, settings.CONST)
+        return paginator.cursor_page(after=after, before=before)
+    paginator = CachedCountPaginator(
+        post_list, settings.CONST, feed, estimate=estimate
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def posts_count_of(author):
+    """Число постов автора из счётчика; без строки счётчика — COUNT(*)."""
+    try:
+        return author.stats.posts_count
+    except ObjectDoesNotExist:
+        return author.posts.count()
@@ -1,47 +1,103 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
 
-from .utils import get_page_context
+from core import holes
+from core.db_router import read_from_replica
+
+from . import lookups, post_cache, timeline
+from .counters import total_posts_count
+from .page_cache import cache_shared_page, depend_on
+from .search import SearchResults
+from .utils import (
+    GLOBAL_FEED, FeedPaginator, author_feed, cached_feed_count,
+    get_page_context, group_feed, post_feed, posts_count_of
+)
 from .models import Group, Post, User
 from .forms import PostForm
 
 
+@read_from_replica
+@cache_shared_page
 def index(request):
-    post_list = Post.objects.all()
+    depend_on(request, GLOBAL_FEED)
+    post_list = Post.objects.select_related('author', 'group')
     context = {
-        'page_obj': get_page_context(post_list, request),
+        'page_obj': get_page_context(
+            post_list, request, estimate=total_posts_count
+        ),
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@cache_shared_page
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    group = lookups.groups.get_or_404(slug)
+    depend_on(request, group_feed(group.pk))
+    post_list = group.posts.select_related('author')
     context = {
         'group': group,
-        'page_obj': get_page_context(post_list, request),
+        'page_obj': get_page_context(
+            post_list, request,
+            feed=group_feed(group.pk),
+            estimate=lambda: group.posts_count,
+        ),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@cache_shared_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    context = {'page_obj': get_page_context(post_list, request),
-               'author': author,
-               }
+    author = lookups.authors.get_or_404(username)
+    feed = author_feed(author.pk)
+    depend_on(request, feed)
+    posts_count = cached_feed_count(feed, lambda: posts_count_of(author))
+    post_list = author.posts.select_related('group')
+    context = {
+        'page_obj': get_page_context(
+            post_list, request, feed=feed, estimate=lambda: posts_count,
+        ),
+        'author': author,
+        'posts_count': posts_count,
+    }
     return render(request, 'posts/profile.html', context)
 
 
+@read_from_replica
+@cache_shared_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = post_cache.get_or_404(post_id)
+    feed = author_feed(post.author_id)
+    feeds = [post_feed(post.pk), feed]
+    if post.group_id is not None:
+        # Название группы показано на странице поста.
+        feeds.append(group_feed(post.group_id))
+    depend_on(request, *feeds)
     context = {
         'post': post,
+        'posts_count': cached_feed_count(
+            feed, lambda: posts_count_of(post.author)
+        ),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = FeedPaginator(SearchResults(query), settings.CONST)
+    context = {
+        'query': query,
+        'query_string': urlencode({'q': query}) + '&',
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None)
@@ -56,7 +112,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post.pk,)
     form = PostForm(request.POST or None, instance=post)
     if form.is_valid():
@@ -65,3 +121,49 @@ def post_edit(request, post_id):
     is_edit = True
     context = {'form': form, 'is_edit': is_edit}
     return render(request, 'posts/create_post.html', context)
+
+
+@login_required
+@read_from_replica
+def follow_index(request):
+    paginator = timeline.TimelinePaginator(request.user, settings.CONST)
+    page_obj = paginator.cursor_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user and timeline.follow(request.user, author=author):
+        holes.changed(request)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    if timeline.unfollow(request.user, author=author):
+        holes.changed(request)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def group_follow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    if timeline.follow(request.user, group=group):
+        holes.changed(request)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+def group_unfollow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    if timeline.unfollow(request.user, group=group):
+        holes.changed(request)
+    return redirect('posts:group_list', slug)
@@ -0,0 +1,129 @@
+"""Прогрев кеша страниц лент после деплоя или очистки кеша.
+
+Горячие группы и авторы выбираются по счёту обращений из
+page_cache.access_counts(); если его не хватает, добавляются самые
+большие ленты по счётчикам постов. Страницы отрисовываются вызовом
+представлений с кешем страниц напрямую, без HTTP и middleware.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve, reverse
+
+from core import db_router
+
+from .models import AuthorStats, Group, Post, User
+from .page_cache import access_counts
+from .utils import encode_cursor
+
+
+def hot_kwargs(view_name, limit):
+    """Аргументы маршрута view_name для самых посещаемых его страниц."""
+    found = []
+    for path in access_counts():
+        try:
+            match = resolve(path)
+        except Resolver404:
+            continue
+        if match.view_name == view_name and match.kwargs not in found:
+            found.append(match.kwargs)
+            if len(found) == limit:
+                break
+    return found
+
+
+def hot_groups(limit):
+    slugs = [
+        kwargs['slug'] for kwargs in hot_kwargs('posts:group_list', limit)
+    ]
+    groups = list(Group.objects.filter(slug__in=slugs))
+    groups.sort(key=lambda group: slugs.index(group.slug))
+    if len(groups) < limit:
+        groups += Group.objects.exclude(slug__in=slugs).order_by(
+            '-posts_count'
+        )[:limit - len(groups)]
+    return groups
+
+
+def hot_authors(limit):
+    names = [
+        kwargs['username'] for kwargs in hot_kwargs('posts:profile', limit)
+    ]
+    authors = list(User.objects.filter(username__in=names))
+    authors.sort(key=lambda author: names.index(author.username))
+    if len(authors) < limit:
+        authors += [
+            stats.author for stats in AuthorStats.objects.exclude(
+                author__username__in=names
+            ).select_related('author').order_by('-posts_count')[
+                :limit - len(authors)
+            ]
+        ]
+    return authors
+
+
+def page_paths(path, posts, pages):
+    """Пути первых pages страниц ленты posts, как на них ссылается
+    пагинатор, но не дальше последней страницы.
+    """
+    per_page = settings.CONST
+    rows = list(
+        posts.order_by('-pub_date', '-pk').only('pub_date')[
+            :per_page * pages
+        ]
+    )
+    count = max(math.ceil(len(rows) / per_page), 1)
+    if settings.PAGINATION_MODE == 'cursor':
+        return [path] + [
+            f'{path}?after={encode_cursor(rows[number * per_page - 1])}'
+            for number in range(1, count)
+        ]
+    return [path] + [f'{path}?page={number}' for number in range(2, count + 1)]
+
+
+def feed_paths(pages, groups, authors):
+    paths = page_paths(reverse('posts:index'), Post.objects.all(), pages)
+    for group in hot_groups(groups):
+        paths += page_paths(
+            reverse('posts:group_list', args=[group.slug]),
+            group.posts.all(), pages,
+        )
+    for author in hot_authors(authors):
+        paths += page_paths(
+            reverse('posts:profile', args=[author.username]),
+            author.posts.all(), pages,
+        )
+    return paths
+
+
+def cache_is_local():
+    """True, если кеш живёт в памяти процесса и прогрев его из команды
+    не увидят процессы сервера."""
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def _fetch(path):
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    match = resolve(request.path_info)
+    # Прогрев читает из основной базы: с реплики страница могла бы
+    # отстать, и кеш страниц её бы не сохранил.
+    db_router.reset(pinned=True)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        return path, response.status_code
+    finally:
+        db_router.reset()
+        connection.close()
+
+
+def warm(paths, workers):
+    """Отрисовывает paths в workers потоков; возвращает [(путь, статус)]."""
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        return list(pool.map(_fetch, paths))
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+
+from posts.admin import BatchedDeleteMixin
+
+User = get_user_model()
+
+
+class UserAdmin(BatchedDeleteMixin, BaseUserAdmin):
+    list_display = BaseUserAdmin.list_display + ('deletion_progress',)
+    posts_field = 'author'
+    posts_deleted = True
+    delete_task = 'posts.delete_user'
+
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+
+from core.cache_stats import cache_stats
+from core.lru import TTLCache, detached
+
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TIMEOUT)
+stats = cache_stats('user_cache')
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кеша процесса.
+
+    Запись сбрасывается при сохранении или удалении пользователя (смена
+    пароля, правка профиля, вход); изменения из других процессов видны
+    не позже чем через USER_CACHE_TIMEOUT секунд.
+    """
+
+    def get_user(self, user_id):
+        user = user_cache.get(user_id)
+        if user is None:
+            stats.miss()
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            user_cache.set(user_id, user)
+        else:
+            stats.hit()
+        # Каждый запрос получает свою копию, без связанных объектов,
+        # загруженных другими запросами: её можно менять.
+        return detached(user)
@@ -44,11 +44,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.HolePunchMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,7 +62,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'core.profiling.TimedDjangoTemplates',
         # Добавлено: Искать шаблоны на уровне проекта
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
@@ -80,10 +85,42 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Продакшен-профиль SQLite включается переменной окружения
+# YATUBE_SQLITE_PRODUCTION=1: WAL, чтобы писатели не блокировали читателей,
+# настроенные PRAGMA на каждом подключении (см. core.sqlite) и подключения,
+# которые живут дольше одного запроса.
+SQLITE_PRODUCTION = os.environ.get('YATUBE_SQLITE_PRODUCTION') == '1'
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if SQLITE_PRODUCTION else {}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600 if SQLITE_PRODUCTION else 0,
+    }
+}
+
+# Реплики только для чтения, например
+# DATABASES['replica'] = {..., 'TEST': {'MIRROR': 'default'}} и
+# DATABASE_REPLICAS = ['replica']; читают из них публичные ленты и пост.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# сколько секунд после записи пользователь читает только из основной базы
+REPLICA_STICKY_SECONDS = 10
+
+# Кеш общий для всех процессов только в общем бэкенде (memcached, redis);
+# LocMemCache годится для разработки и тестов.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -134,7 +171,75 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'users.backends.CachedModelBackend',
 
 ]
+# Сессии читаются из кеша и пишутся в кеш и в базу одновременно.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# кеш пользователей сессий в памяти процесса (см. users.backends)
+USER_CACHE_SIZE = 1000
+USER_CACHE_TIMEOUT = 30
+# кеш процесса для групп по slug и авторов по username (см. posts.lookups);
+# несуществующие ключи запоминаются отдельно и ненадолго
+LOOKUP_CACHE_SIZE = 1000
+LOOKUP_CACHE_TIMEOUT = 30
+LOOKUP_NEGATIVE_SIZE = 10000
+LOOKUP_NEGATIVE_TIMEOUT = 10
 CONST = 10
+# 'pages' — нумерованные страницы, 'cursor' — ?after=/?before= без COUNT(*)
+PAGINATION_MODE = 'pages'
+# сколько секунд кешируется число постов ленты для пагинатора
+FEED_COUNT_TIMEOUT = 60 * 60
+# сколько секунд хранится отрисованная карточка поста
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# сколько секунд хранится пост со снимком автора и группы (см.
+# posts.post_cache)
+POST_OBJECT_TIMEOUT = 60 * 60
+# кеш страниц лент, общий для всех читателей (см. posts.page_cache)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 10
+# промах по странице, которую уже отрисовывает другой запрос, ждёт её до
+# PAGE_CACHE_LOCK_WAIT секунд; блокировка упавшего запроса живёт
+# PAGE_CACHE_LOCK_TIMEOUT секунд
+PAGE_CACHE_LOCK_WAIT = 5
+PAGE_CACHE_LOCK_TIMEOUT = 30
+PAGE_CACHE_POLL_INTERVAL = 0.02
+# счёт обращений к страницам для warm_caches: сколько путей хранить и как
+# часто процесс добавляет к нему свой счёт
+PAGE_HITS_KEEP = 1000
+PAGE_HITS_FLUSH_INTERVAL = 10
+# очередь отложенных заданий (см. core.jobs), её выполняет run_workers;
+# YATUBE_JOBS_EAGER=1 выполняет задания сразу после коммита, без воркеров
+JOBS_EAGER = os.environ.get('YATUBE_JOBS_EAGER') == '1'
+JOBS_MAX_ATTEMPTS = 5
+# пауза перед первым повтором, дальше она удваивается
+JOBS_RETRY_DELAY = 10
+# через сколько секунд задание упавшего воркера берёт другой
+JOBS_LOCK_TIMEOUT = 60 * 10
+# сколько секунд хранится ход удаления из админки (см. posts.deletion)
+DELETION_PROGRESS_TIMEOUT = 60 * 60 * 24
+# лента подписок (см. posts.timeline): посты рассылаются подписчикам
+# пачками заданием очереди; посты авторов и групп, у которых
+# FANOUT_PULL_THRESHOLD подписчиков и больше, подмешиваются при чтении
+FANOUT_BATCH_SIZE = 1000
+FANOUT_PULL_THRESHOLD = 10000
+# сколько последних постов попадает в ленту при подписке
+TIMELINE_BACKFILL = 100
+# сколько секунд кешируются подписки пользователя
+TIMELINE_PULL_TIMEOUT = 60 * 5
+# сколько секунд кешируется список групп для выбора в форме поста
+GROUP_CHOICES_TIMEOUT = 60 * 60
+# Server-Timing и журнал медленных запросов (см. core.profiling)
+PROFILING_ENABLED = True
+SLOW_REQUEST_MS = 500
+# доля запросов под cProfile; профили медленных из них пишутся в PROFILE_DIR
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_KEEP = 20
+# метрики Prometheus на /core/metrics/ (см. core.metrics); при нескольких
+# процессах WSGI-сервера — общий для них каталог, куда процессы сбрасывают
+# значения не чаще раза в METRICS_FLUSH_INTERVAL секунд
+METRICS_MULTIPROC_DIR = None
+METRICS_FLUSH_INTERVAL = 1
+# если задан, /core/metrics/ требует заголовок Authorization: Bearer <токен>
+METRICS_TOKEN = None